@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+"""
+Measure the time and memory of ``get_node_instances()`` for synthetic template trees.
+
+The results are compared with the stored baseline, to catch regressions before a release::
+
+    python benchmarks/run_benchmarks.py             # compare with benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --save      # store the current results as baseline
+
+The ``*_parse`` and ``*_skeleton`` scenarios don't use the cached loader, so each run also
+parses the templates; fully, or as skeleton when ``TEMPLATE_ANALYZER_SKELETON`` is enabled.
+
+The timings depend on the machine, so the baseline should be created on the machine
+that runs the comparison. The number of visited nodes and loaded templates
+doesn't depend on the machine, and should stay exactly the same.
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+if not settings.configured:
+    settings.configure(
+        INSTALLED_APPS=("template_analyzer",),
+        TEMPLATE_ANALYZER_MAX_DEPTH=None,
+        TEMPLATE_ANALYZER_MAX_TEMPLATES=None,
+    )
+    django.setup()
+
+from django.template.backends.django import DjangoTemplates  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from scenarios import SCENARIOS  # noqa: E402
+
+from template_analyzer import AnalysisStats, get_node_instances  # noqa: E402
+from template_analyzer import skeleton as skeleton_module  # noqa: E402
+from template_analyzer.prefilter import register_tag_names, unregister_tag_names  # noqa: E402
+from template_analyzer.skeleton import get_analysis_template  # noqa: E402
+from template_analyzer.templatetags.template_analyzer_test_tags import Placeholder  # noqa: E402
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# The scenarios that are also measured with parsing, fully and as skeleton.
+PARSE_SCENARIOS = ("wide_includes", "tag_heavy")
+
+BENCHMARKS = dict(
+    [(name, (generator, None)) for name, generator in SCENARIOS.items()]
+    + [("{}_parse".format(name), (SCENARIOS[name], False)) for name in PARSE_SCENARIOS]
+    + [("{}_skeleton".format(name), (SCENARIOS[name], True)) for name in PARSE_SCENARIOS]
+)
+
+
+def get_engine(templates, cached=True):
+    # The cached loader is used, like in production. Hence, the benchmark measures
+    # the analysis of the parsed templates, and not the parsing of the templates.
+    loaders = [("django.template.loaders.locmem.Loader", templates)]
+    if cached:
+        loaders = [("django.template.loaders.cached.Loader", loaders)]
+    return DjangoTemplates(
+        {
+            "NAME": "benchmark",
+            "DIRS": (),
+            "APP_DIRS": False,
+            "OPTIONS": {"loaders": loaders},
+        }
+    )
+
+
+def run_scenario(generator, repeat, skeleton=None):
+    """
+    Measure a scenario. With ``skeleton=None``, the templates are parsed once by the
+    cached loader. Otherwise, each run loads the template by name, and parses it again.
+    """
+    templates, template_name = generator()
+    if skeleton is None:
+        template = get_engine(templates).get_template(template_name)
+
+        def analyze(stats=None):
+            return get_node_instances(template, Placeholder, cache=False, stats=stats)
+
+        return measure(analyze, repeat)
+
+    engine = get_engine(templates, cached=False).engine
+    queries = ((None, Placeholder),)
+
+    def analyze(stats=None):
+        # The skeletons are also kept until the template changes, parse these again too.
+        skeleton_module._templates.pop(engine, None)
+        template = get_analysis_template(engine, template_name, queries)
+        return get_node_instances(template, Placeholder, cache=False, stats=stats)
+
+    # The skeleton can only be used when the tag names of the nodes are known.
+    register_tag_names(Placeholder, ("placeholder",))
+    try:
+        with override_settings(TEMPLATE_ANALYZER_SKELETON=skeleton):
+            return measure(analyze, repeat)
+    finally:
+        unregister_tag_names(Placeholder)
+
+
+def measure(analyze, repeat):
+    # The first run collects the statistics, and fills the cached loader (if used).
+    stats = AnalysisStats()
+    nodes = analyze(stats=stats)
+
+    timer = timeit.Timer(analyze)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+
+    tracemalloc.start()
+    try:
+        analyze()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "time_ms": round(best * 1000, 3),
+        "peak_memory_kb": round(peak / 1024, 1),
+        "nodes_found": len(nodes),
+        "nodes_visited": stats.nodes_visited,
+        "templates_loaded": sum(stats.templates_loaded.values()),
+    }
+
+
+def compare(name, result, baseline, tolerance):
+    """
+    Return the regressions of a scenario, compared to the baseline.
+    """
+    errors = []
+    for field in ("nodes_found", "nodes_visited", "templates_loaded"):
+        if result[field] != baseline[field]:
+            errors.append("{} changed from {} to {}".format(field, baseline[field], result[field]))
+
+    for field in ("time_ms", "peak_memory_kb"):
+        limit = baseline[field] * (1 + tolerance)
+        if result[field] > limit:
+            errors.append(
+                "{} increased from {} to {} (limit {:.1f})".format(
+                    field, baseline[field], result[field], limit
+                )
+            )
+    return ["{}: {}".format(name, error) for error in errors]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("scenarios", nargs="*", help="The scenarios to run, by default all.")
+    parser.add_argument("--save", action="store_true", help="Store the results as baseline.")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="The baseline file to use.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="The allowed increase of time and memory, as fraction. Defaults to 0.25.",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="The number of timing runs, the best is used."
+    )
+    options = parser.parse_args(argv)
+
+    names = options.scenarios or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            parser.error("Unknown scenario: {}".format(name))
+
+    results = {}
+    for name in names:
+        generator, skeleton = BENCHMARKS[name]
+        results[name] = run_scenario(generator, options.repeat, skeleton)
+        print(
+            "{:<24} {time_ms:>10.3f} ms {peak_memory_kb:>10.1f} KiB"
+            " {nodes_visited:>8} nodes {templates_loaded:>5} templates".format(
+                name, **results[name]
+            )
+        )
+
+    if options.save:
+        with open(options.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print("Saved baseline to {}".format(options.baseline))
+        return 0
+
+    if not os.path.exists(options.baseline):
+        print("No baseline found, use --save to create it.")
+        return 0
+
+    with open(options.baseline) as f:
+        baseline = json.load(f)
+
+    errors = []
+    for name, result in results.items():
+        if name in baseline:
+            errors.extend(compare(name, result, baseline[name], options.tolerance))
+
+    for error in errors:
+        print(error, file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Generators of synthetic template trees for the benchmarks.
+
+Each generator returns the template sources as dict, and the name of the template to analyze.
+The templates use the ``template_analyzer_test_tags`` library of the test suite.
+"""
+
+LOAD_TAGS = "{% load template_analyzer_test_tags %}"
+
+
+def deep_extends(depth=50):
+    """
+    A long ``{% extends %}`` chain, where each level adds a new block.
+    """
+    templates = {
+        "level{}.html".format(depth): LOAD_TAGS
+        + "".join(
+            '{{% block b{0} %}}{{% placeholder "base{0}" %}}{{% endblock %}}'.format(i)
+            for i in range(depth)
+        )
+    }
+    for i in range(depth):
+        templates["level{}.html".format(i)] = (
+            '{{% extends "level{0}.html" %}}{1}'
+            '{{% block b{2} %}}{{% placeholder "level{2}" %}}{{% endblock %}}'.format(
+                i + 1, LOAD_TAGS, i
+            )
+        )
+    return templates, "level0.html"
+
+
+def wide_includes(width=200, repeat=200):
+    """
+    A page that includes many different partials, and the same partial many times.
+    """
+    templates = {
+        "partial{0}.html".format(i): LOAD_TAGS + '<div>{{% placeholder "partial{0}" %}}'
+        "{{% if item %}}{{{{ item }}}}{{% endif %}}</div>".format(i)
+        for i in range(width)
+    }
+    templates["card.html"] = LOAD_TAGS + '{% placeholder "card" %}{{ card.title }}'
+    templates["page.html"] = (
+        "".join('{{% include "partial{}.html" %}}'.format(i) for i in range(width))
+        + '{% for card in cards %}{% include "card.html" %}{% endfor %}' * repeat
+    )
+    return templates, "page.html"
+
+
+def many_blocks(count=300):
+    """
+    A base template with many blocks, which are all overridden by the child template.
+    """
+    templates = {
+        "base.html": LOAD_TAGS
+        + "".join(
+            '<section>{{% block b{0} %}}{{% placeholder "base{0}" %}}{{% endblock %}}</section>'.format(
+                i
+            )
+            for i in range(count)
+        ),
+        "child.html": '{% extends "base.html" %}'
+        + LOAD_TAGS
+        + "".join(
+            '{{% block b{0} %}}{{% placeholder "child{0}" %}}{{% endblock %}}'.format(i)
+            for i in range(count)
+        ),
+    }
+    return templates, "child.html"
+
+
+def nested_super(depth=50):
+    """
+    A long ``{% extends %}`` chain, where each level calls ``{{ block.super }}``.
+    """
+    templates = {
+        "super{}.html".format(depth): LOAD_TAGS
+        + '{% block content %}{% placeholder "base" %}{% endblock %}'
+    }
+    for i in range(depth):
+        templates["super{}.html".format(i)] = (
+            '{{% extends "super{0}.html" %}}{1}'
+            '{{% block content %}}{{% placeholder "super{2}" %}}{{{{ block.super }}}}'
+            "{{% endblock %}}".format(i + 1, LOAD_TAGS, i)
+        )
+    return templates, "super0.html"
+
+
+def tag_heavy(count=1000):
+    """
+    A large template with many nested tags, including tags of a third-party library.
+    """
+    from template_analyzer import register_child_nodelists
+    from template_analyzer.templatetags.template_analyzer_test_tags import WrapperNode
+
+    # Like a third-party library would, declare where {% wrapper %} stores its contents.
+    register_child_nodelists(WrapperNode, ["nodelist_main"])
+    body = "".join(
+        "{{% if show{0} %}}<p>{{{{ value{0}|default:'' }}}}</p>"
+        "{{% else %}}{{% for item in items %}}{{% with title=item.title %}}"
+        '{{% wrapper %}}{{{{ title }}}}{{% placeholder "slot{0}" %}}{{% endwrapper %}}'
+        "{{% endwith %}}{{% endfor %}}{{% endif %}}".format(i)
+        for i in range(count)
+    )
+    return {"tags.html": LOAD_TAGS + body}, "tags.html"
+
+
+SCENARIOS = {
+    "deep_extends": deep_extends,
+    "wide_includes": wide_includes,
+    "many_blocks": many_blocks,
+    "nested_super": nested_super,
+    "tag_heavy": tag_heavy,
+}
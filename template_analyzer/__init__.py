@@ -1,4 +1,37 @@
-from .djangoanalyzer import get_node_instances
+import sys
+
+import django
+
+from .djangoanalyzer import (
+    find_node_instances,
+    first_node_instance,
+    get_block_map,
+    get_node_instances,
+    get_node_instances_by_type,
+    get_node_instances_by_variant,
+    get_node_records,
+    has_node_instance,
+    iter_node_instances,
+)
+from .inheritance import ResolvedInheritance
+from .nodelists import register_child_nodelists
+from .prefilter import register_tag_names
+from .records import NodeRecord
+from .stats import AnalysisStats
+
+if sys.version_info >= (3, 7):
+    # The async API uses the contextvars module, which is new in Python 3.7.
+    from .asyncanalyzer import (
+        afirst_node_instance,
+        aget_node_instances,
+        aget_node_instances_by_type,
+        aget_node_instances_by_variant,
+        ahas_node_instance,
+        aiter_node_instances,
+    )
+
+if django.VERSION < (3, 2):
+    default_app_config = "template_analyzer.apps.TemplateAnalyzerConfig"
 
 VERSION = (2, 1, 0)
 
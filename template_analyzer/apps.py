@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+
+
+class TemplateAnalyzerConfig(AppConfig):
+    name = "template_analyzer"
+    verbose_name = "Template analyzer"
+
+    def ready(self):
+        # Import the .autoreload module to trigger the registrations of signals.
+        from . import autoreload  # noqa
+
+        # Analyze the templates that are configured by the TEMPLATE_ANALYZER_WARMUP_* settings.
+        from .warmup import start_warmup
+
+        start_warmup()
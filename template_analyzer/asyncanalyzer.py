@@ -0,0 +1,264 @@
+"""
+Async versions of the analyzer functions, for ASGI applications.
+
+Loading and scanning the templates happens in a bounded thread pool,
+so the event loop isn't blocked. The size of the pool is configured by the
+``TEMPLATE_ANALYZER_ASYNC_WORKERS`` setting.
+When multiple coroutines request the same analysis at the same time, the analysis runs once.
+Results that are found in the result cache are returned without using the thread pool.
+"""
+
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.template import Template
+from django.template.backends.django import Template as TemplateAdapter
+
+from . import djangoanalyzer
+from .cache import _normalize_queries, get_default_cache, get_template_key
+
+_executor = None
+_executor_lock = threading.Lock()
+_in_flight = {}
+_in_flight_lock = threading.RLock()
+
+# The number of results that aiter_node_instances() fetches in the first thread pool call.
+# Each next call fetches twice as many, until the maximum is reached.
+_MIN_BATCH_SIZE = 1
+_MAX_BATCH_SIZE = 256
+
+
+def get_executor():
+    """
+    Return the thread pool that is used for the analysis.
+
+    :rtype: concurrent.futures.ThreadPoolExecutor
+    """
+    global _executor
+    max_workers = getattr(settings, "TEMPLATE_ANALYZER_ASYNC_WORKERS", 4)
+    if _executor is None or _executor._max_workers != max_workers:
+        with _executor_lock:
+            if _executor is None or _executor._max_workers != max_workers:
+                _executor = ThreadPoolExecutor(
+                    max_workers=max_workers, thread_name_prefix="template_analyzer"
+                )
+    return _executor
+
+
+def _submit(func, *args):
+    # Like asyncio.to_thread(), the context variables (e.g. the active language) are copied.
+    context = contextvars.copy_context()
+    return get_executor().submit(context.run, func, *args)
+
+
+async def _run(func, *args):
+    return await asyncio.wrap_future(_submit(func, *args))
+
+
+def _get_cache(cache):
+    if cache is None:
+        return get_default_cache()
+    elif cache is False:
+        return None
+    return cache
+
+
+def _get_cached(nodelist, queries, cache):
+    """
+    Return the results from the cache, or ``None`` when the template needs to be analyzed.
+    """
+    template = nodelist.template if isinstance(nodelist, TemplateAdapter) else nodelist
+    if cache is None or not isinstance(template, Template):
+        return None
+
+    cache_key = cache.make_key(template, queries)
+    if cache_key is None:
+        return None
+    return cache.get(cache_key)
+
+
+def _get_in_flight_key(nodelist, queries):
+    template = nodelist.template if isinstance(nodelist, TemplateAdapter) else nodelist
+    if not isinstance(template, Template):
+        # A nodelist can't be recognized.
+        return None
+
+    # Templates without an origin (e.g. constructed from a string) are recognized by the object.
+    return get_template_key(template, queries) or (template, _normalize_queries(queries))
+
+
+def _remove_in_flight(key, future):
+    with _in_flight_lock:
+        if _in_flight.get(key) is future:
+            del _in_flight[key]
+
+
+async def _aget_node_instances(nodelist, queries, cache):
+    """
+    Perform the analysis in the thread pool, or return the results from the cache.
+
+    :param queries: The instances to look for, as tuple of ``(key, types)`` pairs.
+    :returns: A list of ``(key, node, block)`` tuples.
+    """
+    cache = _get_cache(cache)
+    results = _get_cached(nodelist, queries, cache)
+    if results is not None:
+        return results
+
+    # The cache is already resolved; False avoids using the default cache.
+    cache = cache if cache is not None else False
+    key = _get_in_flight_key(nodelist, queries)
+    if key is None:
+        return await _run(djangoanalyzer._get_node_instances, nodelist, queries, cache)
+
+    # Share the analysis with the requests for the same template that are still running.
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        if future is None:
+            future = _submit(djangoanalyzer._get_node_instances, nodelist, queries, cache)
+            _in_flight[key] = future
+            future.add_done_callback(lambda f: _remove_in_flight(key, f))
+
+    # When the caller is cancelled, the analysis continues for the other callers.
+    results = await asyncio.shield(asyncio.wrap_future(future))
+    return list(results)
+
+
+async def aget_node_instances(nodelist, instances, cache=None):
+    """
+    Async version of :func:`~template_analyzer.djangoanalyzer.get_node_instances`.
+
+    :param instances: A class Type, or tuple of types to find.
+    :param nodelist:  The Template object, or nodelist to scan.
+    :param cache: The :class:`~template_analyzer.cache.ResultCache` to use.
+    :type cache: template_analyzer.cache.ResultCache
+    :rtype: list
+    """
+    results = await _aget_node_instances(nodelist, ((None, instances),), cache)
+    return [node for key, node, block in results]
+
+
+async def aget_node_instances_by_type(nodelist, instances, cache=None):
+    """
+    Async version of :func:`~template_analyzer.djangoanalyzer.get_node_instances_by_type`.
+
+    :param instances: A dict of ``{key: class or tuple of types}`` to find.
+    :param nodelist:  The Template object, or nodelist to scan.
+    :param cache: The :class:`~template_analyzer.cache.ResultCache` to use.
+    :type cache: template_analyzer.cache.ResultCache
+    :rtype: dict
+    """
+    results = await _aget_node_instances(nodelist, tuple(instances.items()), cache)
+
+    nodes_by_type = {key: [] for key in instances}
+    for key, node, block in results:
+        nodes_by_type[key].append(node)
+    return nodes_by_type
+
+
+async def aget_node_instances_by_variant(nodelist, instances, variants, cache=None):
+    """
+    Async version of :func:`~template_analyzer.djangoanalyzer.get_node_instances_by_variant`.
+
+    :param instances: A class Type, or tuple of types to find.
+    :param nodelist:  The Template object, or nodelist to scan.
+    :param variants: A list of dicts with the variable values.
+    :param cache: The :class:`~template_analyzer.cache.ResultCache` to use for included templates.
+    :type cache: template_analyzer.cache.ResultCache
+    :rtype: list
+    """
+    return await _run(
+        djangoanalyzer.get_node_instances_by_variant, nodelist, instances, variants, cache
+    )
+
+
+def _next_batch(results, size):
+    batch = []
+    for result in results:
+        batch.append(result)
+        if len(batch) >= size:
+            break
+    return batch
+
+
+async def aiter_node_instances(nodelist, instances, cache=None):
+    """
+    Async version of :func:`~template_analyzer.djangoanalyzer.iter_node_instances`.
+
+    The first result is returned as soon as it's found. Further results are
+    fetched in increasingly larger batches, to limit the number of thread pool calls.
+
+    :param instances: A class Type, or tuple of types to find.
+    :param nodelist:  The Template object, or nodelist to scan.
+    :param cache: The :class:`~template_analyzer.cache.ResultCache` to use.
+    :type cache: template_analyzer.cache.ResultCache
+    :returns: An async generator of Node objects.
+    """
+    queries = ((None, instances),)
+    cache = _get_cache(cache)
+    cached = _get_cached(nodelist, queries, cache)
+    if cached is not None:
+        for key, node, block in cached:
+            yield node
+        return
+
+    results = djangoanalyzer._iter_node_instances(
+        nodelist, queries, cache if cache is not None else False
+    )
+    future = None
+    try:
+        size = _MIN_BATCH_SIZE
+        while True:
+            future = _submit(_next_batch, results, size)
+            batch = await asyncio.wrap_future(future)
+            for key, node, block in batch:
+                yield node
+            if len(batch) < size:
+                break
+            size = min(size * 2, _MAX_BATCH_SIZE)
+    finally:
+        # When the caller stops early, the generator can still be running in the thread pool.
+        if future is None or future.done():
+            results.close()
+        else:
+            future.add_done_callback(lambda f: results.close())
+
+
+async def afirst_node_instance(nodelist, instances, cache=None):
+    """
+    Async version of :func:`~template_analyzer.djangoanalyzer.first_node_instance`.
+
+    :param instances: A class Type, or tuple of types to find.
+    :param nodelist:  The Template object, or nodelist to scan.
+    :param cache: The :class:`~template_analyzer.cache.ResultCache` to use.
+    :type cache: template_analyzer.cache.ResultCache
+    :returns: The first node that :func:`aget_node_instances` would return, or ``None``.
+    """
+    queries = ((None, instances),)
+    cache = _get_cache(cache)
+    cached = _get_cached(nodelist, queries, cache)
+    if cached is not None:
+        return cached[0][1] if cached else None
+
+    return await _run(
+        djangoanalyzer.first_node_instance,
+        nodelist,
+        instances,
+        cache if cache is not None else False,
+    )
+
+
+async def ahas_node_instance(nodelist, instances, cache=None):
+    """
+    Async version of :func:`~template_analyzer.djangoanalyzer.has_node_instance`.
+
+    :param instances: A class Type, or tuple of types to find.
+    :param nodelist:  The Template object, or nodelist to scan.
+    :param cache: The :class:`~template_analyzer.cache.ResultCache` to use.
+    :type cache: template_analyzer.cache.ResultCache
+    :rtype: bool
+    """
+    return await afirst_node_instance(nodelist, instances, cache) is not None
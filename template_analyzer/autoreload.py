@@ -0,0 +1,79 @@
+"""
+Discard the cached results when a template changes during development.
+
+The autoreloader of ``runserver`` sends the ``file_changed`` signal for each changed file.
+Only the results that are based on the changed template are removed from the caches,
+and these can be analyzed again in the background
+when the ``TEMPLATE_ANALYZER_REANALYZE`` setting is enabled.
+"""
+
+import logging
+import threading
+
+from django.conf import settings
+from django.dispatch import receiver
+from django.template import TemplateDoesNotExist, TemplateSyntaxError
+from django.utils.autoreload import file_changed
+
+from .cache import invalidate_template
+
+logger = logging.getLogger(__name__)
+
+
+def _get_template_name(key, origins):
+    # The origin of the analyzed template itself is part of the dependencies.
+    engine, origin_name, loader_name, queries = key
+    for origin in origins:
+        if origin.name == origin_name and origin.loader_name == loader_name:
+            return origin.template_name
+    return None
+
+
+def reanalyze(removed):
+    """
+    Analyze the templates again, to fill the caches with the new results.
+
+    :param removed: The ``(cache, key, origins)`` tuples returned by :func:`invalidate_template`.
+    """
+    from .djangoanalyzer import _get_node_instances, get_node_records
+
+    engines = set()
+    templates = []
+    for cache, key, origins in removed:
+        if key[0] == "include":
+            # The included templates are analyzed as part of the other templates.
+            continue
+        # The records of get_node_records() are stored under the key of the template.
+        template_key = key[1] if key[0] == "records" else key
+
+        template_name = _get_template_name(template_key, origins)
+        if template_name:
+            engines.add(template_key[0])
+            templates.append((cache, template_key[0], template_name, template_key[3], key))
+
+    # The cached loader still has the old template.
+    for engine in engines:
+        for loader in engine.template_loaders:
+            loader.reset()
+
+    for cache, engine, template_name, queries, key in templates:
+        try:
+            template = engine.get_template(template_name)
+            if key[0] == "records":
+                # These are stored for a single node type, see get_node_records().
+                get_node_records(template, queries[0][1], cache, get_name=key[2])
+            else:
+                _get_node_instances(template, queries, cache)
+        except (TemplateDoesNotExist, TemplateSyntaxError) as e:
+            # The template is removed, or still being edited.
+            logger.debug("Unable to analyze %s: %s", template_name, e)
+
+
+@receiver(file_changed, dispatch_uid="template_analyzer_file_changed")
+def template_changed(sender, file_path, **kwargs):
+    if file_path.suffix == ".py":
+        return
+
+    removed = invalidate_template(str(file_path))
+    if removed and getattr(settings, "TEMPLATE_ANALYZER_REANALYZE", False):
+        threading.Thread(target=reanalyze, args=(removed,), daemon=True).start()
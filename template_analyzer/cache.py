@@ -0,0 +1,290 @@
+"""
+Caching of analysis results.
+
+The outcome of :func:`~template_analyzer.djangoanalyzer.get_node_instances` only depends
+on the source of the templates that are read during the scan. The :class:`ResultCache`
+remembers those templates, and discards the result once any of them has changed.
+"""
+
+import hashlib
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist
+from django.template.loaders.filesystem import Loader as FilesystemLoader
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+_caches = weakref.WeakSet()
+
+
+def get_default_cache():
+    """
+    Return the cache that is configured by the ``TEMPLATE_ANALYZER_CACHE_SIZE`` setting.
+    Caching is opt-in, this returns ``None`` when the setting is not defined.
+
+    :rtype: ResultCache
+    """
+    global _default_cache
+    maxsize = getattr(settings, "TEMPLATE_ANALYZER_CACHE_SIZE", 0)
+    if not maxsize:
+        return None
+
+    if _default_cache is None or _default_cache.maxsize != maxsize:
+        with _default_cache_lock:
+            if _default_cache is None or _default_cache.maxsize != maxsize:
+                _default_cache = ResultCache(maxsize=maxsize)
+    return _default_cache
+
+
+def _normalize_types(instance_types):
+    # The same lookup can be done with a single class or a tuple of classes.
+    if isinstance(instance_types, type):
+        return (instance_types,)
+    return tuple(instance_types)
+
+
+def _normalize_queries(queries):
+    return tuple((key, _normalize_types(instance_types)) for key, instance_types in queries)
+
+
+def get_template_key(template, queries):
+    """
+    Return a key that identifies the analysis of a template, e.g. for the cache.
+    This returns ``None`` when the template has no known origin.
+
+    :type template: django.template.base.Template
+    :param queries: The instances to look for, as tuple of ``(key, types)`` pairs.
+    """
+    origin = getattr(template, "origin", None)
+    if origin is None or origin.loader is None:
+        return None
+    return (template.engine, origin.name, origin.loader_name, _normalize_queries(queries))
+
+
+def get_source_hash(contents):
+    """
+    Return the hash of a template source.
+
+    :type contents: str
+    """
+    return hashlib.sha1(contents.encode("utf-8")).hexdigest()
+
+
+def get_origin_signature(origin):
+    """
+    Return a value that changes when the template source of the origin changes.
+    Files are checked by their modification time, other sources by their contents.
+    This returns ``None`` when the origin can't be checked.
+
+    :type origin: django.template.base.Origin
+    """
+    loader = origin.loader
+    if loader is None:
+        # e.g. a template constructed from a string.
+        return None
+
+    if isinstance(loader, FilesystemLoader):
+        try:
+            stat = os.stat(origin.name)
+        except OSError:
+            return ""
+        return (stat.st_mtime_ns, stat.st_size)
+
+    try:
+        contents = loader.get_contents(origin)
+    except TemplateDoesNotExist:
+        return ""
+    return get_source_hash(contents)
+
+
+class ResultCache:
+    """
+    A bounded LRU cache for analysis results.
+
+    Each entry records the templates that were read to produce the result
+    (the template itself, its ``{% extends %}`` parents and ``{% include %}`` templates).
+    When any of these templates changed, the entry is discarded.
+    A reverse index of these templates allows to discard the entries
+    as soon as a template is changed, see :func:`invalidate_template`.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._dependents = {}
+        self._lock = threading.RLock()
+        _caches.add(self)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def make_key(self, template, queries):
+        """
+        Construct the cache key for a template and the node types to find.
+        This returns ``None`` when the template has no known origin, hence can't be cached.
+        Skeleton templates are not cached either, as their nodes can't be rendered
+        and would be returned for the normally loaded template too.
+
+        :type template: django.template.base.Template
+        :param queries: The instances to look for, as tuple of ``(key, types)`` pairs.
+        """
+        from .skeleton import SkeletonTemplate
+
+        if isinstance(template, SkeletonTemplate):
+            return None
+        return get_template_key(template, queries)
+
+    def make_include_key(self, engine, template_name, queries):
+        """
+        Construct the cache key for the results of an ``{% include %}`` tag.
+
+        :type engine: django.template.Engine
+        :param queries: The instances to look for, as tuple of ``(key, types)`` pairs.
+        """
+        return ("include", engine, template_name, _normalize_queries(queries))
+
+    def make_records_key(self, template, queries, get_name=None):
+        """
+        Construct the cache key for the records of :func:`~template_analyzer.get_node_records`.
+
+        :type template: django.template.base.Template
+        :param queries: The instances to look for, as tuple of ``(key, types)`` pairs.
+        :param get_name: The function that gives the ``name`` of each record.
+        """
+        template_key = self.make_key(template, queries)
+        if template_key is None:
+            return None
+        return ("records", template_key, get_name)
+
+    def _get_entry(self, key):
+        with self._lock:
+            try:
+                results, dependencies = self._entries[key]
+            except KeyError:
+                return None
+
+            self._entries.move_to_end(key)
+
+        for origin, signature in dependencies:
+            if get_origin_signature(origin) != signature:
+                self.delete(key)
+                return None
+
+        return results, dependencies
+
+    def get(self, key):
+        """
+        Return the cached results, or ``None`` when the entry is missing or outdated.
+        """
+        entry = self._get_entry(key)
+        if entry is None:
+            return None
+
+        # Return a copy, so changes by the caller don't affect the cache.
+        return list(entry[0])
+
+    def get_with_origins(self, key):
+        """
+        Return the cached results, and the origins of the templates these are based on.
+        This returns ``None`` when the entry is missing or outdated.
+        """
+        entry = self._get_entry(key)
+        if entry is None:
+            return None
+
+        results, dependencies = entry
+        return list(results), [origin for origin, signature in dependencies]
+
+    def set(self, key, results, origins):
+        """
+        Store the results, and the signatures of all templates these results depend on.
+
+        :type origins: Iterable of django.template.base.Origin
+        """
+        dependencies = []
+        for origin in origins:
+            signature = get_origin_signature(origin)
+            if signature is None:
+                # Unable to detect changes, so the result can't be cached.
+                return
+            dependencies.append((origin, signature))
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (list(results), tuple(dependencies))
+            for origin, signature in dependencies:
+                self._dependents.setdefault(origin.name, set()).add(key)
+
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+
+        for origin, signature in entry[1]:
+            keys = self._dependents.get(origin.name)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._dependents[origin.name]
+        return entry
+
+    def delete(self, key):
+        """
+        Remove a single entry from the cache.
+        """
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        """
+        Remove all entries from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._dependents.clear()
+
+    def get_dependents(self, origin_name):
+        """
+        Return the keys of the entries that are based on a template,
+        e.g. the templates that extend or include it.
+
+        :param origin_name: The name of the template origin, which is the full path for files.
+        :rtype: set
+        """
+        with self._lock:
+            return set(self._dependents.get(origin_name, ()))
+
+    def invalidate(self, origin_name):
+        """
+        Remove all entries that are based on a template.
+
+        :param origin_name: The name of the template origin, which is the full path for files.
+        :returns: The removed entries, as list of ``(key, origins)`` tuples.
+        """
+        with self._lock:
+            removed = []
+            for key in self._dependents.get(origin_name, set()).copy():
+                results, dependencies = self._remove(key)
+                removed.append((key, [origin for origin, signature in dependencies]))
+            return removed
+
+
+def invalidate_template(origin_name):
+    """
+    Remove the results that are based on a template from all result caches.
+    This is called by the autoreloader when a template file changes.
+
+    :param origin_name: The name of the template origin, which is the full path for files.
+    :returns: A list of ``(cache, key, origins)`` tuples for the removed entries.
+    """
+    removed = []
+    for cache in list(_caches):
+        removed.extend((cache, key, origins) for key, origins in cache.invalidate(origin_name))
+    return removed
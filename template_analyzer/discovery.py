@@ -0,0 +1,170 @@
+"""
+Finding all templates that the template loaders can provide.
+"""
+
+import os
+
+from django.template import Origin, TemplateDoesNotExist, engines
+from django.template.backends.django import DjangoTemplates
+from django.template.loaders.cached import Loader as CachedLoader
+from django.template.loaders.filesystem import Loader as FilesystemLoader
+from django.template.loaders.locmem import Loader as LocMemLoader
+
+from .cache import get_source_hash
+
+
+def _iter_loaders(loaders):
+    for loader in loaders:
+        if isinstance(loader, CachedLoader):
+            yield from _iter_loaders(loader.loaders)
+        else:
+            yield loader
+
+
+def _iter_directory(template_dir):
+    for root, dirs, files in os.walk(template_dir, followlinks=True):
+        # Skip hidden folders, and walk in a predictable order.
+        dirs[:] = sorted(name for name in dirs if not name.startswith("."))
+        for filename in sorted(files):
+            if filename.startswith("."):
+                continue
+            path = os.path.relpath(os.path.join(root, filename), template_dir)
+            yield path.replace(os.sep, "/")
+
+
+def iter_template_names(engine):
+    """
+    Find the names of all templates that the loaders of the engine can provide.
+    Templates that are provided by multiple loaders are only returned once.
+    Loaders that can't list their templates are skipped.
+
+    :type engine: django.template.Engine
+    """
+    seen = set()
+    for loader in _iter_loaders(engine.template_loaders):
+        if isinstance(loader, FilesystemLoader):
+            names = (
+                name
+                for template_dir in loader.get_dirs()
+                if os.path.isdir(template_dir)
+                for name in _iter_directory(template_dir)
+            )
+        elif isinstance(loader, LocMemLoader):
+            names = iter(loader.templates_dict)
+        else:
+            continue
+
+        for name in names:
+            if name not in seen:
+                seen.add(name)
+                yield name
+
+
+def find_template_source(engine, template_name, skip=None):
+    """
+    Read the source of a template, without parsing it.
+    Like ``Engine.find_template()``, the first loader that has the template is used.
+
+    :type engine: django.template.Engine
+    :param skip: The origins to skip, e.g. to find the template that an ``{% extends %}``
+                 of a template with the same name refers to.
+    :returns: The origin and the source of the template.
+    :raises TemplateDoesNotExist: When none of the loaders has the template.
+    """
+    tried = []
+    for loader in _iter_loaders(engine.template_loaders):
+        for origin in loader.get_template_sources(template_name):
+            if skip is not None and origin in skip:
+                tried.append((origin, "Skipped to avoid recursion"))
+                continue
+            try:
+                return origin, loader.get_contents(origin)
+            except TemplateDoesNotExist:
+                tried.append((origin, "Source does not exist"))
+    raise TemplateDoesNotExist(template_name, tried=tried)
+
+
+def get_origin_source(engine, origin_name, template_name, loader_name):
+    """
+    Read the source of a specific origin, without parsing it.
+    Unlike :func:`find_template_source`, this also reads a template that is overridden
+    by a template with the same name, e.g. in another directory.
+    This returns ``None`` when the template doesn't exist.
+
+    :type engine: django.template.Engine
+    :param origin_name: The ``name`` of the origin, e.g. the path of the template file.
+    :param template_name: The ``template_name`` of the origin.
+    :param loader_name: The ``loader_name`` of the origin, the dotted path of the loader class.
+    :rtype: str
+    """
+    for loader in _iter_loaders(engine.template_loaders):
+        origin = Origin(origin_name, template_name=template_name, loader=loader)
+        if origin.loader_name != loader_name:
+            continue
+        try:
+            return loader.get_contents(origin)
+        except TemplateDoesNotExist:
+            continue
+    return None
+
+
+def get_origin_sources(origins):
+    """
+    Describe the templates of an analysis, so another process can check them for changes.
+    This returns ``None`` when any of the templates can't be found by name.
+
+    :type origins: Iterable of django.template.base.Origin
+    :returns: A list of ``(template name, origin name, loader name, source hash)`` tuples.
+    :rtype: list
+    """
+    sources = []
+    for origin in origins:
+        if origin.loader is None or not origin.template_name:
+            return None
+        contents = origin.loader.get_contents(origin)
+        sources.append(
+            (origin.template_name, origin.name, origin.loader_name, get_source_hash(contents))
+        )
+    return sources
+
+
+def get_current_sources(engine, sources):
+    """
+    Read the templates of :func:`get_origin_sources` again, and return their current state.
+    This returns ``None`` when any of the templates no longer exists.
+
+    :type engine: django.template.Engine
+    :param sources: The tuples returned by :func:`get_origin_sources`.
+    :rtype: list
+    """
+    current_sources = []
+    for template_name, origin_name, loader_name, source_hash in sources:
+        # The origin is read directly, as another template can have the same name,
+        # e.g. when a template extends the template it overrides.
+        contents = get_origin_source(engine, origin_name, template_name, loader_name)
+        if contents is None:
+            return None
+        current_sources.append(
+            (template_name, origin_name, loader_name, get_source_hash(contents))
+        )
+    return current_sources
+
+
+def find_templates(using=None):
+    """
+    Find all templates of the configured Django template engines.
+    When multiple engines provide the same template, the first engine is returned
+    (like :func:`django.template.loader.get_template` does).
+
+    :param using: The alias of the template engine to use, by default all engines are used.
+    :returns: An iterator of ``(engine alias, template name)`` tuples.
+    """
+    seen = set()
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates) or (using and backend.name != using):
+            continue
+
+        for name in iter_template_names(backend.engine):
+            if name not in seen:
+                seen.add(name)
+                yield backend.name, name
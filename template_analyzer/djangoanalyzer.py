@@ -1,15 +1,29 @@
+import time
+import weakref
+
 # Ensure that loader is imported before loader_tags, or a circular import may happen
 # when this file is loaded from an `__init__.py` in an application root.
 # The __init__.py files in applications are loaded very early due to the scan of of translation.activate()
-import django
-import django.template.loader  # noqa
+import django  # isort:skip
+import django.template.loader  # noqa isort:skip
 
 # Normal imports
+from django.conf import settings
 from django.template import Context, NodeList, Template, TemplateSyntaxError
 from django.template.backends.django import Template as TemplateAdapter
 from django.template.base import VariableNode
-from django.template.loader import get_template
 from django.template.loader_tags import BlockNode, ExtendsNode, IncludeNode
+from django.template.loaders.cached import Loader as CachedLoader
+
+from .cache import get_default_cache
+from .inheritance import ResolvedInheritance, get_extends_node, get_template_blocks
+from .nodelists import get_child_nodelists
+from .prefilter import get_tag_names, may_contain
+from .records import NodeRecord
+from .sharedcache import SharedResultCache, get_default_shared_cache
+from .signals import analysis_finished
+from .skeleton import can_use_skeleton, get_skeleton_parent, get_skeleton_template
+from .stats import AnalysisStats
 
 
 def _is_variable_extends(extend_node):
@@ -22,171 +36,800 @@ def _is_variable_extends(extend_node):
     return not isinstance(extend_node.parent_name.var, str)
 
 
-def _extend_blocks(extend_node, blocks, context):
+# The resolved inheritance of the templates that are kept by the cached loader.
+# When the loader is reset, the templates are parsed again and the entries are removed.
+_resolved_inheritances = weakref.WeakKeyDictionary()
+
+
+def _has_cached_loader(engine):
+    return any(isinstance(loader, CachedLoader) for loader in engine.template_loaders)
+
+
+class _IncludeRecording:
+    """
+    The results of scanning an ``{% include %}``, to reuse these for the next occurrence.
     """
-    Extends the dictionary `blocks` with *new* blocks in the parent node (recursive)
 
-    :param extend_node: The ``{% extends .. %}`` node object.
-    :type extend_node: ExtendsNode
-    :param blocks: dict of all block names found in the template.
-    :type blocks: dict
+    __slots__ = ("key", "results", "origins", "uses_super", "uses_variables")
+
+    def __init__(self, key):
+        self.key = key
+        self.results = []
+        self.origins = {}
+        self.uses_super = False
+        self.uses_variables = False
+
+
+class _BlockRecording(_IncludeRecording):
     """
-    try:
-        # This needs a fresh parent context, or it will detection recursion in Django 1.9+,
-        # and thus skip the base template, which is already loaded.
-        parent = extend_node.get_parent(_get_extend_context(context))
-    except TemplateSyntaxError:
-        if _is_variable_extends(extend_node):
-            # we don't support variable extensions unless they have a default.
+    The results of scanning a block, to reuse these for the next variant.
+    """
+
+    __slots__ = ()
+
+
+class _AnalysisMemo:
+    """
+    The work that can be shared between the analyses of multiple variants of a template.
+    Only templates and results that don't depend on the template variables are stored here.
+    """
+
+    __slots__ = ("parents", "includes", "inheritances", "recordings")
+
+    def __init__(self):
+        self.parents = {}
+        self.includes = {}
+        self.inheritances = {}
+        self.recordings = {}
+
+
+class _Pruning:
+    """
+    The rules of :func:`find_node_instances` to skip parts of the templates.
+    """
+
+    __slots__ = ("predicate", "skip_types", "block_names", "max_include_depth")
+
+    def __init__(self, predicate=None, skip_types=None, block_names=None, max_include_depth=None):
+        self.predicate = predicate
+        self.skip_types = tuple(skip_types) if skip_types else None
+        self.block_names = frozenset(block_names) if block_names is not None else None
+        self.max_include_depth = max_include_depth
+
+    def accepts(self, node, current_block):
+        """
+        Check whether a node that matches the queries is returned.
+        """
+        if self.block_names is not None and (
+            current_block is None or current_block.name not in self.block_names
+        ):
+            return False
+        return self.predicate is None or self.predicate(node)
+
+    def allows_block(self, block):
+        """
+        Check whether a block has to be scanned, because it or a nested block is selected.
+        """
+        if self.block_names is None or block.name in self.block_names:
+            return True
+        return any(
+            nested.name in self.block_names
+            for nested in block.nodelist.get_nodes_by_type(BlockNode)
+        )
+
+    def allows_include(self, current_block, include_depth):
+        """
+        Check whether an ``{% include %}`` has to be scanned.
+        """
+        if self.max_include_depth is not None and include_depth > self.max_include_depth:
+            return False
+        return self.block_names is None or (
+            current_block is not None and current_block.name in self.block_names
+        )
+
+
+class _Analysis:
+    """
+    The state of a single :func:`get_node_instances` run.
+
+    This tracks all templates that are visited during the scan,
+    so the outcome can be cached and invalidated when one of them changes.
+    It also keeps the loaded templates, so each template is only loaded once per analysis.
+
+    The ``{{ block.super }}`` relations are stored here too, instead of in the ``BlockNode``.
+    The parsed templates can be shared by the cached loader, so they are never modified.
+    This allows running multiple analyses concurrently.
+
+    The results of each ``{% include %}`` are recorded, so repeated includes
+    of the same template are only scanned once. When a result cache is used,
+    these recordings are also stored in the cache to reuse them in the next analysis.
+
+    When statistics are requested, these are collected in the ``stats`` object.
+    The ``pruning`` rules of :func:`find_node_instances` tell which parts are skipped.
+    When ``TEMPLATE_ANALYZER_SKELETON`` is enabled, the templates are loaded as skeleton,
+    see :mod:`template_analyzer.skeleton`. With ``shared=False``, the resolved ``{% extends %}``
+    chains of other analyses are not reused, as the caller asked to skip all caching.
+
+    The analyses of multiple variants of the same template share a ``memo``,
+    which also allows to reuse the results of the blocks between the variants.
+    """
+
+    def __init__(self, context, cache=None, stats=None, memo=None, pruning=None, shared=True):
+        self.context = context
+        self.cache = cache
+        self.shared = shared
+        self.stats = stats
+        self.pruning = pruning
+        # Whether the templates are loaded as skeleton, decided by the queries of the scan.
+        use_skeleton = getattr(settings, "TEMPLATE_ANALYZER_SKELETON", False) and pruning is None
+        self.skeleton = None if use_skeleton else False
+        self.record_blocks = memo is not None
+        self.origins = {}
+        self.templates_loaded = 0
+        self.templates_visited = 0
+        self.max_depth = getattr(settings, "TEMPLATE_ANALYZER_MAX_DEPTH", 100)
+        self.max_templates = getattr(settings, "TEMPLATE_ANALYZER_MAX_TEMPLATES", 10000)
+        self.supers = {}
+        self._memo = memo if memo is not None else _AnalysisMemo()
+        self._parents = {}
+        self._inheritances = {}
+        self._extend_contexts = {}
+        self._recordings = []
+        self._recorded_includes = {}
+        self._tag_names = {}
+
+    def add_template(self, template):
+        """
+        Register that a template is read during this analysis.
+
+        :type template: django.template.base.Template
+        """
+        origin = getattr(template, "origin", None)
+        if origin is not None:
+            self.add_origin(origin)
+
+    def add_origin(self, origin):
+        """
+        Register that the template of an origin is read during this analysis.
+
+        :type origin: django.template.base.Origin
+        """
+        key = (origin.name, origin.loader)
+        self.origins.setdefault(key, origin)
+        for recording in self._recordings:
+            recording.origins.setdefault(key, origin)
+
+    def add_result(self, result):
+        """
+        Register a result, so it's added to the recordings of all includes that are being scanned.
+        """
+        for recording in self._recordings:
+            recording.results.append(result)
+
+    def add_super(self):
+        """
+        Register that a ``{{ block.super }}`` is followed.
+        The results of the includes that are being scanned depend on the current block now.
+        """
+        for recording in self._recordings:
+            recording.uses_super = True
+
+    def add_variables(self):
+        """
+        Register that a template variable is used to find a template.
+        The results that are being recorded depend on the variables now.
+        """
+        for recording in self._recordings:
+            recording.uses_variables = True
+
+    def resolve_variable(self, filter_expression):
+        """
+        Resolve the template name of a variable ``{% include %}`` or ``{% extends %}`` tag.
+        """
+        self.add_variables()
+        return filter_expression.resolve(self.context)
+
+    def get_include_depth(self):
+        """
+        Return the number of ``{% include %}`` tags that are being scanned.
+        """
+        return sum(1 for r in self._recordings if not isinstance(r, _BlockRecording))
+
+    def start_include(self, key):
+        """
+        Start recording the results of an ``{% include %}``.
+
+        :param key: The included template (or its name), current block and queries.
+        """
+        recording = _IncludeRecording(key)
+        self._recordings.append(recording)
+        if self.stats is not None:
+            include_depth = self.get_include_depth()
+            self.stats.max_include_depth = max(self.stats.max_include_depth, include_depth)
+        return recording
+
+    def start_block(self, block, queries):
+        """
+        Start recording the results of a block, or return the results of a previous variant.
+
+        :returns: The recorded results, or the new recording.
+        """
+        key = (block, queries)
+        recording = self._memo.recordings.get(key)
+        if recording is not None:
+            for origin in recording.origins.values():
+                self.add_origin(origin)
+            return recording.results
+
+        recording = _BlockRecording(key)
+        self._recordings.append(recording)
+        return recording
+
+    def end_recording(self, recording):
+        """
+        Finish recording the results of an ``{% include %}`` or block.
+        """
+        # Recordings are nested, so the last recording is always finished first.
+        self._recordings.pop()
+
+        # Results that depend on the template variables are only reused in this analysis.
+        recordings = self._recorded_includes if recording.uses_variables else self._memo.recordings
+        if isinstance(recording, _BlockRecording):
+            # The {{ block.super }} depends on the parent templates of the variant.
+            if not recording.uses_super and not recording.uses_variables:
+                recordings[recording.key] = recording
             return
+
+        template_name, current_block, queries = recording.key
+        if recording.uses_super:
+            # The results depend on the block the template is included from.
+            recordings[recording.key] = recording
+            return
+
+        # Store the results without the current block, so the recording
+        # can be reused when the template is included from another block.
+        recording.results = [
+            (result_key, node, None if block is current_block else block)
+            for result_key, node, block in recording.results
+        ]
+        recordings[(template_name, queries)] = recording
+
+        if (
+            self.cache is not None
+            and isinstance(template_name, str)
+            and not recording.uses_variables
+        ):
+            cache_key = self.cache.make_include_key(
+                self.context.template.engine, template_name, queries
+            )
+            self.cache.set(cache_key, recording.results, recording.origins.values())
+
+    def _find_recording(self, key):
+        template_name, current_block, queries = key
+        for recordings in (self._recorded_includes, self._memo.recordings):
+            recording = recordings.get(key) or recordings.get((template_name, queries))
+            if recording is not None:
+                return recording
+        return self._get_cached_include(template_name, queries)
+
+    def get_recorded_include(self, key):
+        """
+        Return the recorded results of an ``{% include %}``, or ``None`` if it's not scanned yet.
+
+        :param key: The included template (or its name), current block and queries.
+        """
+        if self.pruning is not None and self.pruning.max_include_depth is not None:
+            # The results depend on the depth the template is included at.
+            return None
+
+        recording = self._find_recording(key)
+        if recording is None:
+            return None
+
+        if self.stats is not None:
+            self.stats.includes_reused += 1
+
+        # Replaying the results also makes them part of the outer recordings.
+        for origin in recording.origins.values():
+            self.add_origin(origin)
+        if recording.uses_variables:
+            self.add_variables()
+        if recording.uses_super:
+            self.add_super()
+            return recording.results
+
+        current_block = key[1]
+        return [
+            (result_key, node, current_block if block is None else block)
+            for result_key, node, block in recording.results
+        ]
+
+    def get_tag_names(self, queries):
+        """
+        Return the names of the tags that create the nodes of the queries, if these are known.
+
+        :param queries: The instances to look for, as tuple of ``(key, types)`` pairs.
+        :rtype: frozenset
+        """
+        try:
+            return self._tag_names[queries]
+        except KeyError:
+            tag_names = get_tag_names(queries)
+            self._tag_names[queries] = tag_names
+            return tag_names
+
+    def start_scan(self, queries):
+        """
+        Prepare the analysis for the queries of the scan.
+        The templates can be loaded as skeleton when the tags of all node types are known.
+        """
+        if self.skeleton is None:
+            self.skeleton = can_use_skeleton(self.get_tag_names(queries))
+
+    def can_skip_include(self, template_name, queries):
+        """
+        Check whether the source of an included template tells it can't contain any results,
+        so the template doesn't have to be loaded and scanned.
+        The checked templates are still registered, so changes to them are detected.
+
+        :param template_name: The name of the included template.
+        :param queries: The instances to look for, as tuple of ``(key, types)`` pairs.
+        """
+        tag_names = self.get_tag_names(queries)
+        if tag_names is None or not isinstance(template_name, str):
+            return False
+
+        engine = self.context.template.engine
+        if may_contain(engine, template_name, tag_names, add_origin=self.add_origin):
+            return False
+
+        if self.stats is not None:
+            self.stats.includes_skipped += 1
+        return True
+
+    def _get_cached_include(self, template_name, queries):
+        if self.cache is None or not isinstance(template_name, str):
+            return None
+
+        cache_key = self.cache.make_include_key(
+            self.context.template.engine, template_name, queries
+        )
+        entry = self.cache.get_with_origins(cache_key)
+        if self.stats is not None:
+            if entry is None:
+                self.stats.cache_misses += 1
+            else:
+                self.stats.cache_hits += 1
+        if entry is None:
+            return None
+
+        recording = _IncludeRecording((template_name, None, queries))
+        recording.results, origins = entry
+        for origin in origins:
+            recording.origins.setdefault((origin.name, origin.loader), origin)
+        self._memo.recordings[(template_name, queries)] = recording
+        return recording
+
+    def check_depth(self, depth):
+        """
+        Guard against endless recursion, e.g. a template that includes itself.
+        """
+        if self.max_depth is not None and depth > self.max_depth:
+            raise TemplateSyntaxError(
+                "Template analysis exceeded the maximum depth of {0} nested"
+                " {{% extends %}} and {{% include %}} tags.".format(self.max_depth)
+            )
+
+    def visit_template(self, template, depth=None):
+        """
+        Register that the nodes of a template are scanned.
+        This guards against templates that take an excessive amount of work to analyze.
+
+        :type template: django.template.base.Template
+        """
+        if depth is not None:
+            self.check_depth(depth)
+
+        self.templates_visited += 1
+        if self.max_templates is not None and self.templates_visited > self.max_templates:
+            raise TemplateSyntaxError(
+                "Template analysis exceeded the maximum of {0} visited templates"
+                " while scanning {1}.".format(self.max_templates, template.origin)
+            )
+
+    def get_super(self, block):
+        """
+        Return the block in the parent template that ``{{ block.super }}`` refers to.
+
+        :type block: BlockNode
+        :rtype: BlockNode
+        """
+        if self.stats is not None:
+            self.stats.super_resolutions += 1
+        return self.supers.get(block)
+
+    def get_parent(self, extend_node):
+        """
+        Return the parent template of an ``{% extends %}`` node.
+
+        :type extend_node: ExtendsNode
+        :rtype: django.template.base.Template
+        """
+        if _is_variable_extends(extend_node):
+            # The parent depends on the variables, so it can't be shared with other variants.
+            self.add_variables()
+            parents = self._parents
         else:
-            raise
+            parents = self._memo.parents
+
+        try:
+            return parents[extend_node]
+        except KeyError:
+            pass
 
-    # Search for new blocks
-    for parent_block in parent.nodelist.get_nodes_by_type(BlockNode):
-        if not parent_block.name in blocks:
-            blocks[parent_block.name] = parent_block
+        # All templates of the same inheritance chain share the context,
+        # so the extends history detects recursion like Django does while rendering.
+        # Each chain starts with a fresh context, otherwise a template
+        # that was already loaded by another chain would be skipped.
+        context = self._extend_contexts.get(extend_node)
+        if context is None:
+            context = _get_extend_context(self.context)
+
+        if self.skeleton:
+            parent = get_skeleton_parent(extend_node, context)
         else:
-            # set this node as the super node (for {{ block.super }})
-            block = blocks[parent_block.name]
-            seen_supers = []
-            while hasattr(block.parent, "nodelist") and block.parent not in seen_supers:
-                seen_supers.append(block.parent)
-                block = block.parent
-            block.parent = parent_block
-
-    # search for further ExtendsNodes in the extended template
-    # There is only one extend block in a template (Django checks for this).
-    parent_extends = parent.nodelist.get_nodes_by_type(ExtendsNode)
-    if parent_extends:
-        _extend_blocks(parent_extends[0], blocks, context)
-
-
-def _find_topmost_template(extend_node, context):
-    try:
-        parent_template = extend_node.get_parent(context)
-    except TemplateSyntaxError:
-        # we don't support variable extensions
-        if _is_variable_extends(extend_node):
-            return
+            parent = extend_node.get_parent(context)
+        self.templates_loaded += 1
+        self.add_template(parent)
+        if self.stats is not None:
+            self.stats.add_template(parent)
+        parents[extend_node] = parent
+
+        parent_extends = get_extends_node(parent)
+        if parent_extends is not None:
+            self._extend_contexts[parent_extends] = context
+        return parent
+
+    def get_inheritance(self, extend_node):
+        """
+        Return the blocks of the complete inheritance chain of an ``{% extends %}`` node.
+        The chain is resolved once, and shared by all analyses of the template
+        when the engine uses the cached loader (unless caching is disabled).
+
+        :type extend_node: ExtendsNode
+        :returns: The resolved chain, or ``None`` when an ``{% extends variable %}`` can't be used.
+        :rtype: template_analyzer.inheritance.ResolvedInheritance
+        """
+        if extend_node in self._inheritances:
+            inheritance = self._inheritances[extend_node]
         else:
-            raise
+            inheritance = self._memo.inheritances.get(extend_node)
+            if inheritance is None:
+                if self.shared and not self.skeleton:
+                    inheritance = _resolved_inheritances.get(extend_node)
+                if inheritance is None:
+                    inheritance = self._resolve_inheritance(extend_node)
+                self._store_inheritance(extend_node, inheritance)
 
-    # There is only one extend block in a template (Django checks for this).
-    parent_extends = parent_template.nodelist.get_nodes_by_type(ExtendsNode)
-    if parent_extends:
-        return _find_topmost_template(parent_extends[0], context)
-    else:
-        # No ExtendsNode
-        return parent_template
+        if inheritance is None:
+            self.add_variables()
+            return None
+
+        # Replaying the chain also makes the templates part of the recordings.
+        if inheritance.is_variable:
+            self.add_variables()
+        for template in inheritance.templates:
+            self.add_template(template)
+            self.visit_template(template)
+        self.supers.update(inheritance.supers)
+        if self.stats is not None:
+            extends_depth = len(inheritance.templates)
+            self.stats.max_extends_depth = max(self.stats.max_extends_depth, extends_depth)
+        return inheritance
+
+    def _resolve_inheritance(self, extend_node):
+        # The blocks of the child template come first, followed by the new blocks of the parents.
+        blocks = extend_node.blocks.copy()
+        last_blocks = blocks.copy()  # The end of the {{ block.super }} chain for each name.
+        supers = {}
+        templates = []
+        is_variable = False
+        while extend_node is not None:
+            if _is_variable_extends(extend_node):
+                is_variable = True
+            try:
+                parent = self.get_parent(extend_node)
+            except TemplateSyntaxError:
+                if _is_variable_extends(extend_node):
+                    # we don't support variable extensions unless they have a default.
+                    return None
+                raise
+
+            templates.append(parent)
+            extend_node = get_extends_node(parent)
+            for name, parent_block in get_template_blocks(parent, extend_node).items():
+                block = last_blocks.get(name)
+                if block is None:
+                    blocks[name] = parent_block
+                else:
+                    # set this node as the super node (for {{ block.super }})
+                    supers[block] = parent_block
+                last_blocks[name] = parent_block
+
+        return ResolvedInheritance(templates, blocks, supers, is_variable=is_variable)
+
+    def _store_inheritance(self, extend_node, inheritance):
+        if inheritance is None or inheritance.is_variable:
+            # The chain depends on the variables, so it can't be shared with other variants.
+            self._inheritances[extend_node] = inheritance
+            return
 
+        self._memo.inheritances[extend_node] = inheritance
+        if self.shared and not self.skeleton and _has_cached_loader(self.context.template.engine):
+            # Without the cached loader, the parent templates can be different next time.
+            _resolved_inheritances[extend_node] = inheritance
+
+    def get_include(self, template_name):
+        """
+        Return the template of an ``{% include %}`` node.
+
+        :param template_name: The template name, or a tuple of names to select the first from.
+        :rtype: django.template.base.Template
+        """
+        try:
+            return self._memo.includes[template_name]
+        except KeyError:
+            pass
+
+        # Use the same engine as {% include %} does, to support custom loaders.
+        engine = self.context.template.engine
+        if self.skeleton:
+            template = get_skeleton_template(engine, template_name)
+        elif isinstance(template_name, tuple):
+            template = engine.select_template(template_name)
+        else:
+            template = engine.get_template(template_name)
+        self.templates_loaded += 1
+        self.add_template(template)
+        if self.stats is not None:
+            self.stats.add_template(template)
+        self._memo.includes[template_name] = template
+        return template
 
-def _extend_nodelist(extends_node, context, instance_types):
+
+def _extend_nodelist(extends_node, analysis, queries, depth):
     """
-    Returns a list of results found in the parent template(s)
+    Returns the scan frames for the parent template(s).
     :type extends_node: ExtendsNode
     """
-    results = []
-
-    # Find all blocks in the complete inheritance chain
-    blocks = extends_node.blocks.copy()  # dict with all blocks in the current template
-    _extend_blocks(extends_node, blocks, context)
+    # Find all blocks in the complete inheritance chain,
+    # no results are returned when the topmost template can't be found.
+    inheritance = analysis.get_inheritance(extends_node)
+    if inheritance is None:
+        return []
 
     # Dive into all blocks of the page one by one
-    all_block_names = list(blocks.keys())
-    for block in list(blocks.values()):
-        results += _scan_nodes(
-            block.nodelist, context, instance_types, block, ignore_blocks=all_block_names
-        )
+    all_block_names = inheritance.block_names
+    blocks = inheritance.blocks.values()
+    pruning = analysis.pruning
+    if pruning is not None and pruning.block_names is not None:
+        # The nested blocks have frames of their own, so other blocks can be skipped entirely.
+        blocks = [block for block in blocks if block.name in pruning.block_names]
 
-    # Scan topmost template for nodes that exist outside of blocks
-    parent_template = _find_topmost_template(extends_node, context)
-    if not parent_template:
-        return []
+    if analysis.record_blocks:
+        # The blocks are started by _scan_nodes(), which can reuse the results of other variants.
+        frames = [(None, queries, block, all_block_names, depth, None) for block in blocks]
     else:
-        results += _scan_nodes(
-            parent_template.nodelist, context, instance_types, ignore_blocks=all_block_names
+        frames = [
+            (iter(block.nodelist), queries, block, all_block_names, depth, None)
+            for block in blocks
+        ]
+
+    # Scan topmost template for nodes that exist outside of blocks
+    if pruning is None or pruning.block_names is None:
+        frames.append(
+            (
+                iter(inheritance.topmost_template.nodelist),
+                queries,
+                None,
+                all_block_names,
+                depth,
+                None,
+            )
         )
-        return results
+    return frames
 
 
-def _scan_nodes(nodelist, context, instance_types, current_block=None, ignore_blocks=None):
+def _scan_nodes(nodelist, analysis, queries, current_block=None, ignore_blocks=None):
     """
-    Loop through all nodes of a single scope level.
+    Loop through all nodes, including the nodes of extended and included templates.
+
+    This uses an explicit stack of the nodelists that are being scanned, instead of recursion.
+    Hence, deeply nested templates don't reach the Python recursion limit.
 
     :type nodelist: django.template.base.NodeList
     :type current_block: BlockNode
-    :param instance_types: The instance to look for
+    :param queries: The instances to look for, as tuple of ``(key, types)`` pairs.
+    :returns: A generator of ``(key, node, block)`` tuples, with the block the node is found in.
     """
-    results = []
-    for node in nodelist:
-        # first check if this is the object instance to look for.
-        if isinstance(node, instance_types):
-            results.append(node)
+    stats = analysis.stats
+    pruning = analysis.pruning
+    analysis.start_scan(queries)
+    stack = [(iter(nodelist), queries, current_block, ignore_blocks, 0, None)]
+    while stack:
+        nodes, queries, current_block, ignore_blocks, depth, recording = stack[-1]
+        if nodes is None:
+            # A block that is shared between variants, see _extend_nodelist().
+            recording = analysis.start_block(current_block, queries)
+            if isinstance(recording, list):
+                stack.pop()
+                for result in recording:
+                    analysis.add_result(result)
+                    yield result
+                continue
+            nodes = iter(current_block.nodelist)
+            stack[-1] = (nodes, queries, current_block, ignore_blocks, depth, recording)
+
+        for node in nodes:
+            if stats is not None:
+                stats.nodes_visited += 1
+
+            if pruning is not None and pruning.skip_types and isinstance(node, pruning.skip_types):
+                continue
+
+            # first check if this is the object instance to look for.
+            found = [key for key, instance_types in queries if isinstance(node, instance_types)]
+            if found and pruning is not None and not pruning.accepts(node, current_block):
+                # Nested nodes can still be accepted.
+                found = []
+            if found:
+                for key in found:
+                    result = (key, node, current_block)
+                    analysis.add_result(result)
+                    yield result
+                if len(found) == len(queries):
+                    continue
+                # Nodes are not scanned for nested nodes of the same type,
+                # but other types can still be found inside this node.
+                node_queries = tuple(query for query in queries if query[0] not in found)
+            else:
+                node_queries = queries
+
             # if it's a Constant Include Node ({% include "template_name.html" %})
-        # scan the child template
-        elif isinstance(node, IncludeNode):
-            # if there's an error in the to-be-included template, node.template becomes None
-            if node.template:
-                # This is required for Django 1.7 but works on older version too
-                # Check if it quacks like a template object, if not
-                # presume is a template path and get the object out of it
-                if not callable(getattr(node.template, "render", None)):
-                    template = get_template(node.template.var)
-                else:
-                    template = node.template
-
-                if isinstance(template, TemplateAdapter):
-                    # Django 1.8+: received a new object, take original template
-                    template = template.template
-
-                results += _scan_nodes(template.nodelist, context, instance_types, current_block)
-        # handle {% extends ... %} tags
-        elif isinstance(node, ExtendsNode):
-            results += _extend_nodelist(node, context, instance_types)
-        # in block nodes we have to scan for super blocks
-        elif isinstance(node, VariableNode) and current_block:
-            if node.filter_expression.token == "block.super":
-                # Found a {{ block.super }} line
-                if not hasattr(current_block.parent, "nodelist"):
-                    raise TemplateSyntaxError(
-                        "Cannot read {{{{ block.super }}}} for {{% block {0} %}}, "
-                        "the parent template doesn't have this block.".format(current_block.name)
+            # scan the child template
+            if isinstance(node, IncludeNode):
+                # if there's an error in the to-be-included template, node.template becomes None
+                if pruning is not None and not pruning.allows_include(
+                    current_block, analysis.get_include_depth() + 1
+                ):
+                    continue
+                if node.template:
+                    # This is required for Django 1.7 but works on older version too
+                    # Check if it quacks like a template object, if not
+                    # presume is a template path and get the object out of it
+                    if not callable(getattr(node.template, "render", None)):
+                        template = None
+                        template_name = node.template.var
+                        if not isinstance(template_name, str):
+                            # {% include variable %}, which is skipped unless a value is given.
+                            template_name = analysis.resolve_variable(node.template)
+                            if not template_name:
+                                continue
+                            if callable(getattr(template_name, "render", None)):
+                                template = template_name
+                            elif not isinstance(template_name, str):
+                                # A list of names, the first existing template is used.
+                                template_name = tuple(template_name)
+                    else:
+                        template = node.template
+
+                    if template is not None:
+                        if isinstance(template, TemplateAdapter):
+                            # Django 1.8+: received a new object, take original template
+                            template = template.template
+                        include_key = (template, current_block, node_queries)
+                    else:
+                        include_key = (template_name, current_block, node_queries)
+
+                    # The same template is only scanned once, unless it depends on the
+                    # current block by using {{ block.super }}.
+                    recorded_results = analysis.get_recorded_include(include_key)
+                    if recorded_results is not None:
+                        for result in recorded_results:
+                            analysis.add_result(result)
+                            yield result
+                        continue
+
+                    if template is None:
+                        if analysis.can_skip_include(template_name, node_queries):
+                            continue
+                        template = analysis.get_include(template_name)
+
+                    analysis.visit_template(template, depth + 1)
+                    recording = analysis.start_include(include_key)
+                    analysis.add_template(template)
+                    stack.append(
+                        (
+                            iter(template.nodelist),
+                            node_queries,
+                            current_block,
+                            None,
+                            depth + 1,
+                            recording,
+                        )
+                    )
+                    break
+            # handle {% extends ... %} tags
+            elif isinstance(node, ExtendsNode):
+                analysis.check_depth(depth + 1)
+                frames = _extend_nodelist(node, analysis, node_queries, depth + 1)
+                if frames:
+                    stack.extend(reversed(frames))
+                    break
+            # in block nodes we have to scan for super blocks
+            elif isinstance(node, VariableNode) and current_block:
+                if node.filter_expression.token == "block.super":
+                    # Found a {{ block.super }} line
+                    parent_block = analysis.get_super(current_block)
+                    analysis.add_super()
+                    if parent_block is None:
+                        raise TemplateSyntaxError(
+                            "Cannot read {{{{ block.super }}}} for {{% block {0} %}}, "
+                            "the parent template doesn't have this block.".format(
+                                current_block.name
+                            )
+                        )
+                    stack.append(
+                        (
+                            iter(parent_block.nodelist),
+                            node_queries,
+                            parent_block,
+                            None,
+                            depth,
+                            None,
+                        )
                     )
-                results += _scan_nodes(
-                    current_block.parent.nodelist, context, instance_types, current_block.parent
-                )
-        # ignore nested blocks which are already handled
-        elif isinstance(node, BlockNode) and ignore_blocks and node.name in ignore_blocks:
-            continue
-        # if the node has the newly introduced 'child_nodelists' attribute, scan
-        # those attributes for nodelists and recurse them
-        elif hasattr(node, "child_nodelists"):
-            for nodelist_name in node.child_nodelists:
-                if hasattr(node, nodelist_name):
-                    subnodelist = getattr(node, nodelist_name)
-                    if isinstance(subnodelist, NodeList):
-                        if isinstance(node, BlockNode):
-                            current_block = node
-                        results += _scan_nodes(subnodelist, context, instance_types, current_block)
-        # else just scan the node for nodelist instance attributes
+                    break
+            # ignore nested blocks which are already handled
+            elif isinstance(node, BlockNode) and ignore_blocks and node.name in ignore_blocks:
+                continue
+            elif (
+                isinstance(node, BlockNode)
+                and pruning is not None
+                and not pruning.allows_block(node)
+            ):
+                continue
+            # scan the attributes that hold child nodes, e.g. 'child_nodelists' of Django nodes.
+            else:
+                block = node if isinstance(node, BlockNode) else current_block
+                frames = [
+                    (iter(subnodelist), node_queries, block, None, depth, None)
+                    for subnodelist in (
+                        getattr(node, nodelist_name, None)
+                        for nodelist_name in get_child_nodelists(node)
+                    )
+                    if isinstance(subnodelist, NodeList)
+                ]
+                if frames:
+                    stack.extend(reversed(frames))
+                    break
         else:
-            for attr in dir(node):
-                obj = getattr(node, attr)
-                if isinstance(obj, NodeList):
-                    if isinstance(node, BlockNode):
-                        current_block = node
-                    results += _scan_nodes(obj, context, instance_types, current_block)
-    return results
+            # All nodes of this nodelist are scanned.
+            stack.pop()
+            if recording is not None:
+                analysis.end_recording(recording)
 
 
-def _get_main_context(nodelist):
-    # The context is empty, but needs to be provided to handle the {% extends %} node.
-    context = Context({})
+def _get_main_context(nodelist, variables=None):
+    # The context only contains the given variables, it's needed to handle the {% extends %} node.
+    context = Context(variables or {})
 
     if isinstance(nodelist, TemplateAdapter):
         # The top-level context.
         context.template = Template("", engine=nodelist.template.engine)
+    elif isinstance(nodelist, Template):
+        # A template from Engine.get_template(), which is not wrapped by the backend.
+        context.template = Template("", engine=nodelist.engine)
     else:
         # Just in case a different nodelist is provided.
         # Using the default template now.
@@ -195,14 +838,136 @@ def _get_main_context(nodelist):
 
 
 def _get_extend_context(parent_context):
-    # For extends nodes, a fresh template instance is constructed.
-    # The loader cache of the original `nodelist` is skipped.
-    context = Context({})
+    # For extends nodes, a fresh context is constructed, with the same variables.
+    # The template loaders of the engine are still used, including the cached loader.
+    context = Context(parent_context.flatten())
     context.template = Template("", engine=parent_context.template.engine)
     return context
 
 
-def get_node_instances(nodelist, instances):
+def _start_analysis(
+    nodelist, cache=None, stats=None, variables=None, memo=None, pruning=None, shared=True
+):
+    """
+    Construct the analysis state.
+
+    :param variables: The values of the variables in ``{% extends %}`` and ``{% include %}`` tags.
+    :param memo: The :class:`_AnalysisMemo` that is shared between variants.
+    :param pruning: The :class:`_Pruning` rules to skip parts of the templates.
+    :param shared: Whether the state that is shared between analyses can be used,
+                   this is disabled when the caller passes ``cache=False``.
+    :returns: The nodelist to scan, and the analysis state.
+    """
+    context = _get_main_context(nodelist, variables)
+
+    # The Django loader returns an adapter class;
+    # it wraps the original Template in a new object to be API compatible
+    if isinstance(nodelist, TemplateAdapter):
+        nodelist = nodelist.template
+
+    analysis = _Analysis(
+        context, cache=cache, stats=stats, memo=memo, pruning=pruning, shared=shared
+    )
+    if isinstance(nodelist, Template):
+        analysis.add_template(nodelist)
+        # As of Django 4.1, template Node objects no longer allow iteration,
+        # which breaks Template.__iter__ too. Instead, directly walk over the nodelist.
+        nodelist = nodelist.nodelist
+
+    return nodelist, analysis
+
+
+def _analyze(nodelist, queries):
+    """
+    Perform the actual analysis, without using the cache.
+
+    :param queries: The instances to look for, as tuple of ``(key, types)`` pairs.
+    :returns: A list of ``(key, node, block)`` tuples, and the analysis state.
+    """
+    nodelist, analysis = _start_analysis(nodelist)
+    return list(_scan_nodes(nodelist, analysis, queries)), analysis
+
+
+def _iter_node_instances(nodelist, queries, cache, stats=None, pruning=None, shared=None):
+    """
+    Perform the analysis, or return the results from the cache.
+    The results are only stored in the cache when the generator is fully consumed.
+
+    :param queries: The instances to look for, as tuple of ``(key, types)`` pairs.
+    :param stats: The :class:`~template_analyzer.stats.AnalysisStats` to fill.
+    :param pruning: The :class:`_Pruning` rules to skip parts of the templates.
+    :param shared: Whether the resolved ``{% extends %}`` chains can be reused.
+                   By default, this is disabled by ``cache=False`` too.
+    :returns: A generator of ``(key, node, block)`` tuples.
+    """
+    if shared is None:
+        shared = cache is not False
+    if cache is None:
+        cache = get_default_cache()
+    elif cache is False:
+        cache = None
+    elif isinstance(cache, SharedResultCache):
+        raise TypeError("The Node objects can't be shared, use get_node_records() instead.")
+
+    # Statistics are only collected when someone is interested in them.
+    if stats is None and analysis_finished.has_listeners():
+        stats = AnalysisStats()
+
+    if stats is None:
+        yield from _scan_or_get_cached(nodelist, queries, cache, None, pruning, shared)
+        return
+
+    template = nodelist.template if isinstance(nodelist, TemplateAdapter) else nodelist
+    origin = getattr(template, "origin", None)
+    stats.template_name = getattr(origin, "template_name", None)
+    start = time.perf_counter()
+    try:
+        yield from _scan_or_get_cached(nodelist, queries, cache, stats, pruning, shared)
+    finally:
+        # This also happens when the caller stops early, or an error is raised.
+        stats.duration = time.perf_counter() - start
+        analysis_finished.send(sender=AnalysisStats, stats=stats)
+
+
+def _scan_or_get_cached(nodelist, queries, cache, stats, pruning=None, shared=True):
+    template = nodelist.template if isinstance(nodelist, TemplateAdapter) else nodelist
+    cache_key = None
+    if cache is not None and isinstance(template, Template):
+        cache_key = cache.make_key(template, queries)
+        if cache_key is not None:
+            results = cache.get(cache_key)
+            if stats is not None:
+                if results is None:
+                    stats.cache_misses += 1
+                else:
+                    stats.cache_hits += 1
+            if results is not None:
+                yield from results
+                return
+
+    nodelist, analysis = _start_analysis(
+        nodelist, cache=cache, stats=stats, pruning=pruning, shared=shared
+    )
+    results = []
+    for result in _scan_nodes(nodelist, analysis, queries):
+        results.append(result)
+        yield result
+
+    if cache_key is not None:
+        cache.set(cache_key, results, analysis.origins.values())
+
+
+def _get_node_instances(nodelist, queries, cache, stats=None):
+    """
+    Perform the analysis, or return the results from the cache.
+
+    :param queries: The instances to look for, as tuple of ``(key, types)`` pairs.
+    :returns: A list of ``(key, node, block)`` tuples.
+    """
+    return list(_iter_node_instances(nodelist, queries, cache, stats))
+
+
+def get_node_instances(nodelist, instances, cache=None, stats=None):
     """
     Find the nodes of a given instance.
 
@@ -212,19 +977,249 @@ def get_node_instances(nodelist, instances):
 
     :param instances: A class Type, or tuple of types to find.
     :param nodelist:  The Template object, or nodelist to scan.
+    :param cache: The :class:`~template_analyzer.cache.ResultCache` to use.
+                  By default, the cache configured by ``TEMPLATE_ANALYZER_CACHE_SIZE`` is used.
+                  Pass ``False`` to skip caching, this also resolves the ``{% extends %}``
+                  chain again instead of reusing it from a previous analysis.
+    :type cache: template_analyzer.cache.ResultCache
+    :param stats: An :class:`~template_analyzer.stats.AnalysisStats` object to collect
+                  statistics of the analysis in.
+    :type stats: template_analyzer.stats.AnalysisStats
     :returns: A list of Node objects which inherit from the list of given `instances` to find.
     :rtype: list
     """
-    context = _get_main_context(nodelist)
+    results = _get_node_instances(nodelist, ((None, instances),), cache, stats)
+    return [node for key, node, block in results]
 
-    # The Django loader returns an adapter class;
-    # it wraps the original Template in a new object to be API compatible
-    if isinstance(nodelist, TemplateAdapter):
-        nodelist = nodelist.template
 
-    if isinstance(nodelist, Template):
-        # As of Django 4.1, template Node objects no longer allow iteration,
-        # which breaks Template.__iter__ too. Instead, directly walk over the nodelist.
-        nodelist = nodelist.nodelist
+def get_node_instances_by_type(nodelist, instances, cache=None, stats=None):
+    """
+    Find the nodes of multiple types, using a single scan of the template.
+
+    This gives the same results as calling :func:`get_node_instances` for each type,
+    but the template and all its ``{% extends %}`` and ``{% include %}`` templates
+    are only processed once.
+
+    :param instances: A dict of ``{key: class or tuple of types}`` to find.
+    :param nodelist:  The Template object, or nodelist to scan.
+    :param cache: The :class:`~template_analyzer.cache.ResultCache` to use.
+    :type cache: template_analyzer.cache.ResultCache
+    :param stats: The :class:`~template_analyzer.stats.AnalysisStats` to fill.
+    :type stats: template_analyzer.stats.AnalysisStats
+    :returns: A dict with the same keys, and the list of Node objects found for each key.
+    :rtype: dict
+    """
+    queries = tuple(instances.items())
+    results = _get_node_instances(nodelist, queries, cache, stats)
+
+    nodes_by_type = {key: [] for key in instances}
+    for key, node, block in results:
+        nodes_by_type[key].append(node)
+    return nodes_by_type
 
-    return _scan_nodes(nodelist, context, instances)
+
+def find_node_instances(
+    nodelist,
+    instances,
+    predicate=None,
+    skip_types=None,
+    block_names=None,
+    max_include_depth=None,
+    stats=None,
+):
+    """
+    Find the nodes of a given instance, skipping the parts of the template that are not needed.
+
+    The rules are applied while scanning the template, so the skipped parts
+    and the templates they include are not loaded or scanned at all.
+    The results are not stored in the result cache, as these depend on the rules.
+    The resolved ``{% extends %}`` chain is still reused between calls.
+
+    :param nodelist:  The Template object, or nodelist to scan.
+    :param instances: A class Type, or tuple of types to find.
+    :param predicate: A function that receives each found node, and returns whether to include it.
+    :param skip_types: Node classes that are skipped with all their contents,
+                       e.g. ``(IfNode, ForNode)`` to skip the ``{% if %}`` and ``{% for %}`` tags.
+    :param block_names: Only return the nodes inside the ``{% block %}`` tags with these names.
+                        The nodes and ``{% include %}`` tags outside these blocks are skipped.
+    :param max_include_depth: The number of nested ``{% include %}`` tags to follow,
+                              e.g. ``0`` to skip all included templates.
+    :param stats: The :class:`~template_analyzer.stats.AnalysisStats` to fill.
+    :type stats: template_analyzer.stats.AnalysisStats
+    :returns: A list of Node objects which inherit from the list of given `instances` to find.
+    :rtype: list
+    """
+    pruning = _Pruning(predicate, skip_types, block_names, max_include_depth)
+    # Only the result cache is skipped, the resolved {% extends %} chains are still reused.
+    results = _iter_node_instances(
+        nodelist, ((None, instances),), False, stats, pruning, shared=True
+    )
+    return [node for key, node, block in results]
+
+
+def get_node_records(nodelist, instances, cache=None, get_name=None):
+    """
+    Find the nodes of a given instance, and return lightweight records of them.
+
+    This returns the same nodes as :func:`get_node_instances`, as
+    :class:`~template_analyzer.records.NodeRecord` objects. These don't reference
+    the parsed templates, so caching them takes little memory. They can also be pickled.
+
+    :param instances: A class Type, or tuple of types to find.
+    :param nodelist:  The Template object, or nodelist to scan.
+    :param cache: The :class:`~template_analyzer.cache.ResultCache` to store the records in,
+                  or a :class:`~template_analyzer.sharedcache.SharedResultCache` to share them
+                  between processes. By default, the cache configured by
+                  ``TEMPLATE_ANALYZER_SHARED_CACHE`` or ``TEMPLATE_ANALYZER_CACHE_SIZE`` is used.
+    :type cache: template_analyzer.cache.ResultCache
+    :param get_name: A function that returns the identifying data of a node,
+                     by default the ``get_name()`` method of the node is used.
+    :rtype: list
+    """
+    shared = cache is not False
+    if cache is None:
+        cache = get_default_shared_cache() or get_default_cache()
+    elif cache is False:
+        cache = None
+
+    queries = ((None, instances),)
+    template = nodelist.template if isinstance(nodelist, TemplateAdapter) else nodelist
+    cache_key = None
+    if cache is not None and isinstance(template, Template):
+        cache_key = cache.make_records_key(template, queries, get_name)
+        if cache_key is not None:
+            records = cache.get(cache_key)
+            if records is not None:
+                return records
+
+    # The analysis doesn't use the cache, as it would store the Node objects of included templates.
+    scan_nodelist, analysis = _start_analysis(nodelist, shared=shared)
+    records = [
+        NodeRecord.from_node(node, block, get_name)
+        for key, node, block in _scan_nodes(scan_nodelist, analysis, queries)
+    ]
+
+    if cache_key is not None:
+        cache.set(cache_key, records, analysis.origins.values())
+    return records
+
+
+def get_block_map(template, variables=None):
+    """
+    Return the blocks of a template, after resolving its ``{% extends %}`` chain.
+
+    This gives the final block for each block name, the blocks that ``{{ block.super }}``
+    refers to, and the topmost template that has the nodes outside of the blocks.
+    The outcome is shared with the analysis of the template.
+
+    :param template: The Template object.
+    :param variables: The values of the variables in ``{% extends %}`` tags.
+    :returns: The resolved chain, or ``None`` when an ``{% extends variable %}`` can't be used.
+    :rtype: template_analyzer.inheritance.ResolvedInheritance
+    """
+    _, analysis = _start_analysis(template, variables=variables)
+    if isinstance(template, TemplateAdapter):
+        template = template.template
+
+    extends_node = get_extends_node(template)
+    if extends_node is None:
+        # The template itself is the topmost template.
+        return ResolvedInheritance([template], get_template_blocks(template), {})
+    return analysis.get_inheritance(extends_node)
+
+
+def get_node_instances_by_variant(nodelist, instances, variants, cache=None):
+    """
+    Find the nodes of a given instance, for multiple values of the template variables.
+
+    By default, ``{% extends variable %}`` and ``{% include variable %}`` tags are skipped.
+    This function analyzes the template for each set of variables, e.g. for each base template
+    a page can use. The work that doesn't depend on the variables is shared between the variants,
+    such as scanning the blocks of the template and the templates they include.
+
+    :param nodelist:  The Template object, or nodelist to scan.
+    :param instances: A class Type, or tuple of types to find.
+    :param variants: A list of dicts with the variable values, e.g.
+                     ``[{"base_template": "layout1.html"}, {"base_template": "layout2.html"}]``.
+                     Use :func:`itertools.product` to combine the values of multiple variables.
+    :param cache: The :class:`~template_analyzer.cache.ResultCache` to use for included templates.
+    :type cache: template_analyzer.cache.ResultCache
+    :returns: A list with the nodes found for each variant, in the same ordering as ``variants``.
+    :rtype: list
+    """
+    shared = cache is not False
+    if cache is None:
+        cache = get_default_cache()
+    elif cache is False:
+        cache = None
+
+    queries = ((None, instances),)
+    memo = _AnalysisMemo()
+    nodes_by_variant = []
+    for variables in variants:
+        scan_nodelist, analysis = _start_analysis(
+            nodelist, cache=cache, variables=variables, memo=memo, shared=shared
+        )
+        results = _scan_nodes(scan_nodelist, analysis, queries)
+        nodes_by_variant.append([node for key, node, block in results])
+    return nodes_by_variant
+
+
+def iter_node_instances(nodelist, instances, cache=None, stats=None):
+    """
+    Find the nodes of a given instance, as generator.
+
+    This returns the same nodes as :func:`get_node_instances`, in the same ordering.
+    Included templates are only loaded when the scan reaches them,
+    so stopping early avoids the work of scanning the remaining template.
+
+    :param instances: A class Type, or tuple of types to find.
+    :param nodelist:  The Template object, or nodelist to scan.
+    :param cache: The :class:`~template_analyzer.cache.ResultCache` to use.
+    :type cache: template_analyzer.cache.ResultCache
+    :param stats: The :class:`~template_analyzer.stats.AnalysisStats` to fill.
+    :type stats: template_analyzer.stats.AnalysisStats
+    :returns: A generator of Node objects.
+    """
+    queries = ((None, instances),)
+    for key, node, block in _iter_node_instances(nodelist, queries, cache, stats):
+        yield node
+
+
+def first_node_instance(nodelist, instances, cache=None, stats=None):
+    """
+    Find the first node of a given instance, e.g. to read the first placeholder of a template.
+    To read the first N nodes, use ``itertools.islice(iter_node_instances(...), N)``.
+
+    :param instances: A class Type, or tuple of types to find.
+    :param nodelist:  The Template object, or nodelist to scan.
+    :param cache: The :class:`~template_analyzer.cache.ResultCache` to use.
+    :type cache: template_analyzer.cache.ResultCache
+    :param stats: The :class:`~template_analyzer.stats.AnalysisStats` to fill.
+    :type stats: template_analyzer.stats.AnalysisStats
+    :returns: The first node that :func:`get_node_instances` would return, or ``None``.
+    """
+    results = _iter_node_instances(nodelist, ((None, instances),), cache, stats)
+    try:
+        for key, node, block in results:
+            return node
+        return None
+    finally:
+        # Finish the analysis now, instead of when the generator is garbage collected.
+        results.close()
+
+
+def has_node_instance(nodelist, instances, cache=None, stats=None):
+    """
+    Check whether the template contains a node of a given instance.
+    The scan stops at the first node that is found.
+
+    :param instances: A class Type, or tuple of types to find.
+    :param nodelist:  The Template object, or nodelist to scan.
+    :param cache: The :class:`~template_analyzer.cache.ResultCache` to use.
+    :type cache: template_analyzer.cache.ResultCache
+    :param stats: The :class:`~template_analyzer.stats.AnalysisStats` to fill.
+    :type stats: template_analyzer.stats.AnalysisStats
+    :rtype: bool
+    """
+    return first_node_instance(nodelist, instances, cache, stats) is not None
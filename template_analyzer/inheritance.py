@@ -0,0 +1,103 @@
+"""
+The outcome of resolving the ``{% extends %}`` chain of a template.
+"""
+
+from django.template.base import TextNode
+from django.template.loader_tags import BlockNode, ExtendsNode
+
+
+def get_extends_node(template):
+    """
+    Return the ``{% extends %}`` node of a template, or ``None``.
+
+    Django requires the ``{% extends %}`` tag to be the first tag of the template,
+    so only the first nodes are inspected instead of the whole template.
+
+    :type template: django.template.base.Template
+    :rtype: ExtendsNode
+    """
+    for node in template.nodelist:
+        if isinstance(node, ExtendsNode):
+            return node
+        elif not isinstance(node, TextNode):
+            # Django doesn't allow an {% extends %} tag after other tags.
+            return None
+    return None
+
+
+def get_template_blocks(template, extends_node=None):
+    """
+    Return all blocks of a single template, by name.
+
+    :type template: django.template.base.Template
+    :rtype: dict
+    """
+    if extends_node is not None:
+        # Django already collected the blocks while parsing the {% extends %} tag.
+        return extends_node.blocks
+    return {block.name: block for block in template.nodelist.get_nodes_by_type(BlockNode)}
+
+
+class ResolvedInheritance:
+    """
+    The blocks of a template, after resolving its ``{% extends %}`` chain.
+
+    This is computed once for each template, and shared by all analyses of the template.
+    It doesn't reference the template itself, only the blocks and parent templates.
+    """
+
+    __slots__ = ("templates", "blocks", "supers", "block_names", "is_variable", "__weakref__")
+
+    def __init__(self, templates, blocks, supers, is_variable=False):
+        #: The parent templates, from the direct parent up to the topmost template.
+        #: For a template without ``{% extends %}``, this is only the template itself.
+        self.templates = templates
+        #: The final block for each block name, in the ordering these are scanned.
+        self.blocks = blocks
+        #: The block that ``{{ block.super }}`` refers to, for each block that has one.
+        self.supers = supers
+        #: The names of all blocks. The blocks with these names in the topmost template
+        #: are replaced by the final blocks.
+        self.block_names = frozenset(blocks)
+        #: Whether an ``{% extends variable %}`` is used in the chain.
+        self.is_variable = is_variable
+
+    def __repr__(self):
+        return "<{} {} templates, {} blocks>".format(
+            self.__class__.__name__, len(self.templates), len(self.blocks)
+        )
+
+    @property
+    def topmost_template(self):
+        """
+        The template at the top of the chain, which has the nodes outside of the blocks.
+
+        :rtype: django.template.base.Template
+        """
+        return self.templates[-1]
+
+    def get_super_chain(self, name):
+        """
+        Return the final block of the given name,
+        followed by the blocks that ``{{ block.super }}`` refers to.
+
+        :rtype: list
+        """
+        block = self.blocks.get(name)
+        chain = []
+        while block is not None:
+            chain.append(block)
+            block = self.supers.get(block)
+        return chain
+
+    def get_outside_nodes(self):
+        """
+        Return the top-level nodes of the topmost template, without the blocks.
+
+        :rtype: list
+        """
+        return [
+            node
+            for node in self.topmost_template.nodelist
+            if not (isinstance(node, BlockNode) and node.name in self.block_names)
+        ]
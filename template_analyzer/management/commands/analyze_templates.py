@@ -0,0 +1,110 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from template_analyzer.discovery import find_templates
+from template_analyzer.manifest import analyze_template, create_manifest
+
+
+def _analyze_in_worker(using, template_name, node_types):
+    # Worker processes that are not forked need to initialize Django first.
+    # This is not done by an executor initializer, as Python 3.6 doesn't support these.
+    if not apps.ready:
+        django.setup()
+    return analyze_template(using, template_name, node_types)
+
+
+class Command(BaseCommand):
+    help = (
+        "Analyze all templates of the configured template loaders,"
+        " and write a JSON manifest of the nodes found in them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "node_types",
+            nargs="+",
+            metavar="node_type",
+            help="Dotted path of a Node class to find, e.g. mycms.templatetags.tags.Placeholder",
+        )
+        parser.add_argument(
+            "-o",
+            "--output",
+            default="-",
+            help="The file to write the manifest to. By default, it's written to stdout.",
+        )
+        parser.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="The number of processes to use. Defaults to the number of CPUs.",
+        )
+        parser.add_argument(
+            "--indent",
+            type=int,
+            help="Indent the JSON output. By default, a compact manifest is written.",
+        )
+        parser.add_argument(
+            "--engine",
+            dest="using",
+            help="Only analyze the templates of this template engine.",
+        )
+
+    def handle(self, *args, **options):
+        node_types = options["node_types"]
+        for path in node_types:
+            try:
+                import_string(path)
+            except ImportError as e:
+                raise CommandError("Unable to import node type {}: {}".format(path, e))
+
+        jobs = options["jobs"]
+        if jobs < 1:
+            raise CommandError("The number of jobs should be at least 1.")
+
+        templates = list(find_templates(using=options["using"]))
+        self.verbosity = options["verbosity"]
+        self.total = len(templates)
+
+        using = [alias for alias, name in templates]
+        names = [name for alias, name in templates]
+        if jobs == 1 or self.total <= 1:
+            entries = map(analyze_template, using, names, repeat(node_types))
+            manifest = create_manifest(node_types, self._report_progress(names, entries))
+        else:
+            chunksize = max(1, self.total // (jobs * 8))
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                entries = executor.map(
+                    _analyze_in_worker, using, names, repeat(node_types), chunksize=chunksize
+                )
+                manifest = create_manifest(node_types, self._report_progress(names, entries))
+
+        json_options = {"indent": options["indent"]}
+        if options["indent"] is None:
+            json_options["separators"] = (",", ":")
+
+        if options["output"] == "-":
+            self.stdout.write(json.dumps(manifest, **json_options))
+        else:
+            with open(options["output"], "w") as f:
+                json.dump(manifest, f, **json_options)
+
+    def _report_progress(self, names, entries):
+        # The progress is written to stderr, as the manifest may be written to stdout.
+        for done, (name, entry) in enumerate(zip(names, entries), 1):
+            if "error" in entry and self.verbosity >= 1:
+                self.stderr.write("{}: {}".format(name, entry["error"]))
+            if self.verbosity >= 2 or (
+                self.verbosity >= 1 and (done % 100 == 0 or done == self.total)
+            ):
+                self.stderr.write(
+                    "Analyzed {}/{} templates".format(done, self.total), style_func=str
+                )
+            yield name, entry
@@ -0,0 +1,218 @@
+"""
+A manifest of the nodes found in all templates.
+
+The manifest is a JSON-serializable dict, which is written by the ``analyze_templates``
+management command. It has the following structure::
+
+    {
+        "version": 1,
+        "node_types": ["mycms.templatetags.placeholdertags.Placeholder"],
+        "templates": {
+            "mycms/default-page.html": {
+                "engine": "django",
+                "nodes": [
+                    {
+                        "type": "mycms.templatetags.placeholdertags.Placeholder",
+                        "name": "main",
+                        "block": "content",
+                        "template": "mycms/base.html",
+                        "line": 12,
+                        "position": [310, 335]
+                    }
+                ],
+                "sources": [
+                    [
+                        "mycms/default-page.html",
+                        "/srv/mysite/mycms/templates/mycms/default-page.html",
+                        "django.template.loaders.app_directories.Loader",
+                        "6a1f0c..."
+                    ],
+                    [
+                        "mycms/base.html",
+                        "/srv/mysite/mycms/templates/mycms/base.html",
+                        "django.template.loaders.app_directories.Loader",
+                        "93be27..."
+                    ]
+                ]
+            },
+            "mycms/broken.html": {
+                "engine": "django",
+                "error": "TemplateSyntaxError: Invalid block tag on line 2: 'foo'."
+            }
+        }
+    }
+
+The ``template`` and ``line`` of a node refer to the template the node is defined in,
+which can be a parent template or included template.
+The ``sources`` contain the name, origin, loader and source hash of each template
+that was read during the analysis. At runtime, the :class:`Manifest` uses these to check
+whether the results are still valid. As the origins are file paths for most loaders,
+the manifest should be created with the templates at the same location as where it's used.
+"""
+
+import json
+import threading
+
+from django.conf import settings
+from django.template import engines
+from django.template.loader import get_template
+from django.utils.module_loading import import_string
+
+from .discovery import get_current_sources, get_origin_sources
+from .djangoanalyzer import _analyze, _get_node_instances
+from .records import NodeRecord
+from .skeleton import get_analysis_template
+
+MANIFEST_VERSION = 1
+
+_default_manifest = None
+_default_manifest_lock = threading.Lock()
+
+
+def _serialize_node(key, node, block):
+    record = NodeRecord.from_node(node, block)
+    position = getattr(getattr(node, "token", None), "position", None)
+    return {
+        "type": key,
+        "name": record.name,
+        "block": record.block_name,
+        "template": record.template_name,
+        "line": record.line,
+        "position": list(position) if position else None,
+    }
+
+
+def _get_queries(node_types):
+    return tuple((path, import_string(path)) for path in node_types)
+
+
+def analyze_template(using, template_name, node_types):
+    """
+    Analyze a single template, and return the manifest entry for it.
+    Errors are reported in the entry, so a broken template doesn't stop the analysis of others.
+
+    :param using: The alias of the template engine.
+    :param node_types: The dotted paths of the Node classes to find.
+    :rtype: dict
+    """
+    queries = _get_queries(node_types)
+    try:
+        template = get_analysis_template(engines[using].engine, template_name, queries)
+        results, analysis = _analyze(template, queries)
+        # Store the source hashes of all templates, to detect changes at runtime.
+        # When a template can't be found by name, changes can't be detected.
+        sources = get_origin_sources(analysis.origins.values())
+        if sources is not None:
+            sources = [list(source) for source in sources]
+    except Exception as e:
+        return {"engine": using, "error": "{}: {}".format(e.__class__.__name__, e)}
+
+    return {
+        "engine": using,
+        "nodes": [_serialize_node(key, node, block) for key, node, block in results],
+        "sources": sources,
+    }
+
+
+def create_manifest(node_types, entries):
+    """
+    Construct the manifest.
+
+    :param node_types: The dotted paths of the Node classes that were searched for.
+    :param entries: An iterable of ``(template name, entry)`` tuples.
+    :rtype: dict
+    """
+    return {
+        "version": MANIFEST_VERSION,
+        "node_types": list(node_types),
+        "templates": dict(entries),
+    }
+
+
+class Manifest:
+    """
+    Provide the analysis results from a manifest that was created at build time.
+
+    The results are only used when the template and all its parent and included templates
+    still have the same source as when the manifest was created. Otherwise, the template
+    is analyzed at runtime. The sources of a template are only checked once;
+    the outcome never expires, so changes made after that are not noticed
+    until the manifest is loaded again (e.g. when the server restarts).
+    """
+
+    def __init__(self, data):
+        if data.get("version") != MANIFEST_VERSION:
+            raise ValueError("Unsupported manifest version: {}".format(data.get("version")))
+        self.node_types = data["node_types"]
+        self.templates = data["templates"]
+        self._queries = None
+        self._verified = set()
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load the manifest file written by the ``analyze_templates`` management command.
+        """
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def is_current(self, template_name):
+        """
+        Check whether the manifest entry of the template can be used.
+        """
+        if template_name in self._verified:
+            return True
+
+        entry = self.templates.get(template_name)
+        if entry is None or "error" in entry or entry.get("sources") is None:
+            return False
+
+        engine = engines[entry["engine"]].engine
+        sources = [tuple(source) for source in entry["sources"]]
+        if get_current_sources(engine, sources) != sources:
+            return False
+
+        self._verified.add(template_name)
+        return True
+
+    def get_nodes(self, template_name, cache=None):
+        """
+        Return the nodes found in the template, in the format of the manifest.
+        When the manifest is outdated for this template, it's analyzed at runtime.
+
+        :param cache: The :class:`~template_analyzer.cache.ResultCache` to use for runtime analysis.
+        :rtype: list
+        """
+        if self.is_current(template_name):
+            return list(self.templates[template_name]["nodes"])
+
+        if self._queries is None:
+            self._queries = _get_queries(self.node_types)
+
+        entry = self.templates.get(template_name)
+        if entry is not None:
+            template = engines[entry["engine"]].get_template(template_name)
+        else:
+            template = get_template(template_name)
+
+        results = _get_node_instances(template, self._queries, cache)
+        return [_serialize_node(key, node, block) for key, node, block in results]
+
+
+def get_default_manifest():
+    """
+    Return the manifest configured by the ``TEMPLATE_ANALYZER_MANIFEST`` setting.
+    This returns ``None`` when the setting is not defined.
+
+    :rtype: Manifest
+    """
+    global _default_manifest
+    path = getattr(settings, "TEMPLATE_ANALYZER_MANIFEST", None)
+    if not path:
+        return None
+
+    if _default_manifest is None or _default_manifest[0] != path:
+        with _default_manifest_lock:
+            if _default_manifest is None or _default_manifest[0] != path:
+                _default_manifest = (path, Manifest.load(path))
+    return _default_manifest[1]
@@ -0,0 +1,78 @@
+"""
+Registry of the attributes that hold the child nodes of a template node.
+
+The analyzer needs to know where a node stores its nested nodes, e.g. the body of ``{% if %}``.
+Django nodes declare this in their ``child_nodelists`` attribute.
+Other nodes are inspected once, and the outcome is remembered for the node class.
+Tag libraries can also declare the attributes explicitly,
+using :func:`register_child_nodelists`.
+"""
+
+from types import MemberDescriptorType
+
+_registry = {}
+_plans = {}
+
+
+def register_child_nodelists(node_class, nodelist_names):
+    """
+    Declare which attributes of a node class contain a ``NodeList``.
+    This also applies to subclasses of the node class.
+
+    :param node_class: The Node subclass.
+    :param nodelist_names: The attribute names, e.g. ``("nodelist_true", "nodelist_false")``.
+    """
+    _registry[node_class] = tuple(nodelist_names)
+    _plans.clear()
+
+
+def unregister_child_nodelists(node_class):
+    """
+    Remove a declaration made by :func:`register_child_nodelists`.
+    """
+    _registry.pop(node_class, None)
+    _plans.clear()
+
+
+def _find_child_nodelists(node):
+    for node_class in type(node).__mro__:
+        try:
+            return _registry[node_class]
+        except KeyError:
+            pass
+
+    try:
+        return tuple(node.child_nodelists)
+    except AttributeError:
+        pass
+
+    # Inspect the node for data attributes. This happens only once for each class,
+    # so all instance attributes are kept, as another instance could hold a NodeList there.
+    # The analyzer checks the type of the value when it reads them.
+    # Properties are skipped, as reading them is slow, and could even have side effects.
+    node_class = type(node)
+    return tuple(
+        name
+        for name in dir(node)
+        if not name.startswith("__")
+        and (
+            not hasattr(node_class, name)
+            or isinstance(getattr(node_class, name), MemberDescriptorType)
+        )
+    )
+
+
+def get_child_nodelists(node):
+    """
+    Return the attribute names of the node that may contain a ``NodeList``.
+
+    :type node: django.template.base.Node
+    :rtype: tuple
+    """
+    node_class = type(node)
+    try:
+        return _plans[node_class]
+    except KeyError:
+        names = _find_child_nodelists(node)
+        _plans[node_class] = names
+        return names
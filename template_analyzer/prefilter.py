@@ -0,0 +1,175 @@
+"""
+A fast check of the template sources, to skip included templates that can't contain the nodes.
+
+Parsing a template constructs all its nodes, while the lexer only splits the source in tokens.
+When the names of the tags that create a node class are declared using :func:`register_tag_names`,
+the tokens tell whether a template can contain these nodes. The ``{% include %}`` and
+``{% extends %}`` tags in the source are followed too, so an included template is only skipped
+when none of the templates it uses has these tags. This avoids loading, parsing and scanning
+templates such as icons and form snippets.
+"""
+
+import weakref
+
+from django.template import TemplateDoesNotExist
+from django.template.base import Lexer, TokenType
+
+from .cache import get_origin_signature
+from .discovery import find_template_source
+
+_registry = {}
+_sources = weakref.WeakKeyDictionary()
+
+
+def register_tag_names(node_class, tag_names):
+    """
+    Declare the names of the template tags that create a node class, or any of its subclasses.
+    Included templates that don't use these tags are skipped when searching for the node class.
+
+    :param node_class: The Node subclass.
+    :param tag_names: The tag names, e.g. ``("placeholder", "page_placeholder")``.
+    """
+    _registry[node_class] = frozenset(tag_names)
+
+
+def unregister_tag_names(node_class):
+    """
+    Remove a declaration made by :func:`register_tag_names`.
+    """
+    _registry.pop(node_class, None)
+
+
+def _find_tag_names(instance_type):
+    # A subclass is created by the same tags (or a subset of them) as the registered class.
+    for node_class in instance_type.__mro__:
+        try:
+            return _registry[node_class]
+        except KeyError:
+            pass
+    return None
+
+
+def get_tag_names(queries):
+    """
+    Return the names of all tags that can create the nodes of the queries.
+    This returns ``None`` when this is not known for one of the node classes.
+
+    :param queries: The instances to look for, as tuple of ``(key, types)`` pairs.
+    :rtype: frozenset
+    """
+    tag_names = set()
+    for key, instance_types in queries:
+        if isinstance(instance_types, type):
+            instance_types = (instance_types,)
+        for instance_type in instance_types:
+            names = _find_tag_names(instance_type)
+            if names is None:
+                return None
+            tag_names.update(names)
+    return frozenset(tag_names)
+
+
+def _get_constant_name(bits):
+    # Only literal template names can be followed, e.g. {% include "name.html" %}
+    if len(bits) < 2:
+        return None
+    name = bits[1]
+    if len(name) >= 2 and name[0] in "\"'" and name[-1] == name[0]:
+        return name[1:-1]
+    return None
+
+
+class TemplateSource:
+    """
+    The tags that are used in the source of a template.
+    """
+
+    __slots__ = ("origin", "signature", "tag_names", "templates", "is_dynamic")
+
+    def __init__(self, origin, signature, contents):
+        #: The origin of the template.
+        self.origin = origin
+        #: The signature of the source, to detect changes.
+        self.signature = signature
+        #: The names of all tags in the template.
+        self.tag_names = set()
+        #: The names of the ``{% include %}`` and ``{% extends %}`` templates.
+        self.templates = []
+        #: Whether the template uses something the source doesn't tell about,
+        #: such as ``{% include variable %}`` or ``{{ block.super }}``.
+        self.is_dynamic = False
+
+        for token in Lexer(contents).tokenize():
+            if token.token_type == TokenType.BLOCK:
+                tag_name = token.contents.split(None, 1)[0] if token.contents else ""
+                self.tag_names.add(tag_name)
+                if tag_name in ("include", "extends"):
+                    template_name = _get_constant_name(token.split_contents())
+                    if template_name is None:
+                        self.is_dynamic = True
+                    else:
+                        self.templates.append(template_name)
+            elif token.token_type == TokenType.VAR and token.contents.startswith("block.super"):
+                # The parent block can contain any node.
+                self.is_dynamic = True
+
+
+def get_source_info(engine, template_name):
+    """
+    Return the tags that are used by a template, or ``None`` when the template doesn't exist.
+    The outcome is remembered until the source of the template changes.
+
+    :type engine: django.template.Engine
+    :rtype: TemplateSource
+    """
+    try:
+        sources = _sources[engine]
+    except KeyError:
+        sources = _sources.setdefault(engine, {})
+
+    source = sources.get(template_name)
+    if source is not None and get_origin_signature(source.origin) == source.signature:
+        return source
+
+    try:
+        origin, contents = find_template_source(engine, template_name)
+    except TemplateDoesNotExist:
+        sources.pop(template_name, None)
+        return None
+
+    source = TemplateSource(origin, get_origin_signature(origin), contents)
+    sources[template_name] = source
+    return source
+
+
+def may_contain(engine, template_name, tag_names, add_origin=None):
+    """
+    Check whether a template, or any of the templates it includes or extends,
+    may contain one of the given tags.
+
+    :type engine: django.template.Engine
+    :param tag_names: The tag names, as returned by :func:`get_tag_names`.
+    :param add_origin: A function that receives the origin of every checked template.
+    :rtype: bool
+    """
+    seen = {template_name}
+    pending = [template_name]
+    while pending:
+        current = pending.pop()
+        source = get_source_info(engine, current)
+        if source is None:
+            # Let the analyzer report the missing template.
+            return True
+        if add_origin is not None:
+            add_origin(source.origin)
+        if source.is_dynamic or not tag_names.isdisjoint(source.tag_names):
+            return True
+
+        for name in source.templates:
+            if name == current:
+                # e.g. {% extends %} of a template with the same name in another directory.
+                return True
+            elif name not in seen:
+                seen.add(name)
+                pending.append(name)
+    return False
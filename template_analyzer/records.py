@@ -0,0 +1,79 @@
+"""
+Lightweight records of the nodes that are found in a template.
+
+The ``Node`` objects reference the complete parsed template.
+A :class:`NodeRecord` only keeps the data that identifies the node,
+so it can be cached, pickled and shared between processes with a small memory footprint.
+"""
+
+
+def get_node_name(node):
+    """
+    Return the name of a node, when it provides a ``get_name()`` method.
+    """
+    get_name = getattr(node, "get_name", None)
+    return get_name() if callable(get_name) else None
+
+
+class NodeRecord:
+    """
+    The information of a node that was found in a template.
+    """
+
+    __slots__ = ("node_class", "name", "template_name", "block_name", "line")
+
+    def __init__(self, node_class, name=None, template_name=None, block_name=None, line=None):
+        #: The class of the node.
+        self.node_class = node_class
+        #: The identifying data of the node, e.g. the name of a placeholder.
+        self.name = name
+        #: The name of the template the node is defined in, e.g. a parent or included template.
+        self.template_name = template_name
+        #: The name of the ``{% block %}`` the node is found in, or ``None``.
+        self.block_name = block_name
+        #: The line number of the node in its template.
+        self.line = line
+
+    @classmethod
+    def from_node(cls, node, block=None, get_name=None):
+        """
+        Construct the record for a node.
+
+        :type node: django.template.base.Node
+        :type block: django.template.loader_tags.BlockNode
+        :param get_name: A function that returns the identifying data of the node.
+                         By default, the ``get_name()`` method of the node is used.
+        """
+        token = getattr(node, "token", None)
+        origin = getattr(node, "origin", None)
+        return cls(
+            node_class=node.__class__,
+            name=(get_name or get_node_name)(node),
+            template_name=origin.template_name if origin is not None else None,
+            block_name=block.name if block is not None else None,
+            line=token.lineno if token is not None else None,
+        )
+
+    def _astuple(self):
+        return (self.node_class, self.name, self.template_name, self.block_name, self.line)
+
+    def __reduce__(self):
+        # Keep the pickled form small, like a tuple.
+        return (self.__class__, self._astuple())
+
+    def __eq__(self, other):
+        if not isinstance(other, NodeRecord):
+            return NotImplemented
+        return self._astuple() == other._astuple()
+
+    def __hash__(self):
+        return hash(self._astuple())
+
+    def __repr__(self):
+        return "<{} {}: {!r} in {}:{}>".format(
+            self.__class__.__name__,
+            self.node_class.__name__,
+            self.name,
+            self.template_name,
+            self.line,
+        )
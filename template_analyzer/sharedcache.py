@@ -0,0 +1,185 @@
+"""
+Sharing analysis results between processes, using the Django cache framework.
+
+The :class:`~template_analyzer.cache.ResultCache` keeps the results in the memory
+of a single process. The :class:`SharedResultCache` stores the results in one of the
+configured ``CACHES``, so all worker processes (and servers) reuse the analysis of each other,
+and the results survive a restart. Only serializable results are stored, such as the
+:class:`~template_analyzer.records.NodeRecord` objects of
+:func:`~template_analyzer.djangoanalyzer.get_node_records`.
+
+The results are stored by the hash of the source of every template that was read
+during the analysis. For each analyzed template, the cache also keeps the origins of these
+templates, so the hashes of their current sources give the key to the results.
+Hence, results are never outdated, and different versions of a template can be cached at once.
+"""
+
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+from .cache import _normalize_queries
+from .discovery import _iter_loaders, get_current_sources, get_origin_sources
+
+_default_shared_cache = None
+_default_shared_cache_lock = threading.Lock()
+
+
+def get_default_shared_cache():
+    """
+    Return the cache that is configured by the ``TEMPLATE_ANALYZER_SHARED_CACHE`` setting,
+    which is the alias of one of the ``CACHES``.
+    This returns ``None`` when the setting is not defined.
+
+    :rtype: SharedResultCache
+    """
+    global _default_shared_cache
+    alias = getattr(settings, "TEMPLATE_ANALYZER_SHARED_CACHE", None)
+    if not alias:
+        return None
+
+    if _default_shared_cache is None or _default_shared_cache.alias != alias:
+        with _default_shared_cache_lock:
+            if _default_shared_cache is None or _default_shared_cache.alias != alias:
+                _default_shared_cache = SharedResultCache(alias)
+    return _default_shared_cache
+
+
+def _get_path(value):
+    # Classes and functions are identified by their dotted path, which all processes share.
+    # This returns None for objects that can't be found by a dotted path,
+    # such as lambdas, nested functions, functools.partial() objects and callable instances.
+    module = getattr(value, "__module__", None)
+    qualname = getattr(value, "__qualname__", None)
+    if not module or not qualname or "<" in qualname:
+        return None
+    return "{}.{}".format(module, qualname)
+
+
+def _get_engine_identity(engine):
+    # The engine object differs in each process, so it's identified by its loaders instead.
+    # Engines with other template directories can provide another template by the same name.
+    identity = []
+    for loader in _iter_loaders(engine.template_loaders):
+        get_dirs = getattr(loader, "get_dirs", None)
+        dirs = tuple(str(path) for path in get_dirs()) if get_dirs is not None else ()
+        identity.append((_get_path(type(loader)), dirs))
+    return tuple(identity)
+
+
+def _make_hash(*parts):
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+
+class SharedResultCache:
+    """
+    Store the analysis results in a Django cache backend, to share them between processes.
+
+    :param alias: The alias of the cache in the ``CACHES`` setting.
+    :param timeout: The timeout of the cache entries, by default the timeout of the cache backend.
+    :param key_prefix: The prefix of the cache keys.
+    """
+
+    def __init__(self, alias="default", timeout=DEFAULT_TIMEOUT, key_prefix="template_analyzer"):
+        self.alias = alias
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+
+    @property
+    def cache(self):
+        """
+        The Django cache backend; Django keeps a separate connection for each thread.
+        """
+        return caches[self.alias]
+
+    def make_records_key(self, template, queries, get_name=None):
+        """
+        Construct the key for the records of a template.
+        The key includes the loaders of the engine and the origin of the template,
+        so a template with the same name in another engine gets another key.
+        This returns ``None`` when the analysis can't be identified in other processes,
+        e.g. for templates without an origin, or when ``get_name`` is a lambda
+        or another callable that has no dotted path.
+
+        :type template: django.template.base.Template
+        :param queries: The instances to look for, as tuple of ``(key, types)`` pairs.
+        :param get_name: The function that gives the ``name`` of each record.
+        """
+        origin = getattr(template, "origin", None)
+        if origin is None or origin.loader is None or not origin.template_name:
+            return None
+
+        get_name_path = None
+        if get_name is not None:
+            get_name_path = _get_path(get_name)
+            if get_name_path is None:
+                return None
+
+        queries = tuple(
+            (key, tuple(_get_path(instance_type) for instance_type in instance_types))
+            for key, instance_types in _normalize_queries(queries)
+        )
+        if any(None in paths for key, paths in queries):
+            return None
+        index_key = "{}:index:{}".format(
+            self.key_prefix,
+            _make_hash(
+                "records",
+                _get_engine_identity(template.engine),
+                origin.template_name,
+                origin.name,
+                origin.loader_name,
+                queries,
+                get_name_path,
+            ),
+        )
+        return (template.engine, index_key)
+
+    def _get_results_key(self, index_key, sources):
+        source_hashes = tuple(source[-1] for source in sources)
+        return "{}:results:{}".format(self.key_prefix, _make_hash(index_key, source_hashes))
+
+    def get(self, key):
+        """
+        Return the cached results, or ``None`` when these are missing
+        or any of the templates has a different source now.
+        """
+        engine, index_key = key
+        sources = self.cache.get(index_key)
+        if sources is None:
+            return None
+
+        current_sources = get_current_sources(engine, sources)
+        if current_sources is None:
+            return None
+
+        results = self.cache.get(self._get_results_key(index_key, current_sources))
+        return list(results) if results is not None else None
+
+    def set(self, key, results, origins):
+        """
+        Store the results, by the source hashes of all templates these results depend on.
+
+        :type origins: Iterable of django.template.base.Origin
+        """
+        engine, index_key = key
+        sources = get_origin_sources(origins)
+        if sources is None:
+            # The template can't be found by name in other processes.
+            return
+
+        self.cache.set_many(
+            {index_key: sources, self._get_results_key(index_key, sources): list(results)},
+            timeout=self.timeout,
+        )
+
+    def delete(self, key):
+        """
+        Remove the origins of the templates that a result depends on,
+        so the template is analyzed again.
+        """
+        engine, index_key = key
+        self.cache.delete(index_key)
@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+#: Sent after each analysis, with the :class:`~template_analyzer.stats.AnalysisStats`
+#: as ``stats`` argument. The statistics are only collected while there are receivers.
+analysis_finished = Signal()
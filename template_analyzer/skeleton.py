@@ -0,0 +1,254 @@
+"""
+Parsing templates into a skeleton, which only has the nodes that the analyzer needs.
+
+A normal parse compiles every variable, filter and template tag. The analyzer only
+needs the ``{% block %}``, ``{% extends %}`` and ``{% include %}`` tags, the ``{{ block.super }}``
+variables and the tags it searches for. A skeleton template skips the text and variables,
+and replaces the built-in Django tags that can't contain these nodes by lightweight nodes.
+All other tags are compiled as usual, including the tags of custom libraries.
+Hence, the analysis of a valid template finds the same nodes, in the same blocks and templates.
+
+Skeleton templates are only used for analysis, these can't be rendered.
+The nodes found in a skeleton can't be rendered either, as the text, variables and built-in
+tags inside them are not compiled. The replaced built-in tags render as an empty string.
+The templates of the ``analyze_templates`` command are parsed as skeleton too,
+see :func:`get_analysis_template`. Other templates are parsed by the caller,
+and only their parents and includes use a skeleton.
+"""
+
+import weakref
+
+from django.conf import settings
+from django.template import Template, TemplateDoesNotExist, TemplateSyntaxError, defaulttags
+from django.template.base import DebugLexer, Lexer, Node, NodeList, Parser, TokenType
+
+from .cache import get_origin_signature
+from .discovery import find_template_source
+from .prefilter import get_tag_names
+
+# The built-in tags with contents, and the tags that end each section of the contents.
+SKELETON_BLOCK_TAGS = {
+    "autoescape": ("endautoescape",),
+    "filter": ("endfilter",),
+    "for": ("empty", "endfor"),
+    "if": ("elif", "else", "endif"),
+    "ifchanged": ("else", "endifchanged"),
+    "spaceless": ("endspaceless",),
+    "with": ("endwith",),
+}
+
+# The built-in tags without contents.
+SKELETON_LEAF_TAGS = (
+    "csrf_token",
+    "cycle",
+    "debug",
+    "firstof",
+    "lorem",
+    "now",
+    "regroup",
+    "resetcycle",
+    "templatetag",
+    "url",
+    "widthratio",
+)
+
+SKELETON_TAG_NAMES = frozenset(SKELETON_BLOCK_TAGS).union(SKELETON_LEAF_TAGS)
+
+_templates = weakref.WeakKeyDictionary()
+
+
+class SkeletonNode(Node):
+    """
+    The replacement of a built-in tag with contents, such as ``{% if %}`` or ``{% for %}``.
+    The nodes of all sections are combined in a single nodelist, in the same ordering.
+    """
+
+    child_nodelists = ("nodelist",)
+
+    def __init__(self, nodelist):
+        self.nodelist = nodelist
+
+    def render(self, context):
+        return ""
+
+
+class SkippedNode(Node):
+    """
+    The replacement of a built-in tag without contents, such as ``{% url %}``.
+    """
+
+    child_nodelists = ()
+
+    def render(self, context):
+        return ""
+
+
+def _compile_block_tag(end_tags):
+    def compile_func(parser, token):
+        nodelist = NodeList()
+        while True:
+            nodelist.extend(parser.parse(end_tags))
+            token = parser.next_token()
+            if token.contents.split()[0] == end_tags[-1]:
+                return SkeletonNode(nodelist)
+
+    return compile_func
+
+
+def _compile_leaf_tag(parser, token):
+    return SkippedNode()
+
+
+class SkeletonParser(Parser):
+    """
+    A parser that replaces the built-in tags of :data:`SKELETON_TAG_NAMES`.
+    When a library that is loaded in the template overrides these tags, that tag is used instead.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        builtin_tags = defaulttags.register.tags
+        for name, end_tags in SKELETON_BLOCK_TAGS.items():
+            if name in builtin_tags and self.tags.get(name) is builtin_tags[name]:
+                self.tags[name] = _compile_block_tag(end_tags)
+        for name in SKELETON_LEAF_TAGS:
+            if name in builtin_tags and self.tags.get(name) is builtin_tags[name]:
+                self.tags[name] = _compile_leaf_tag
+
+
+def _get_skeleton_tokens(tokens):
+    # Until the first tag, the variables are kept so Django still reports
+    # an {% extends %} that is not the first tag of the template.
+    seen_tag = False
+    for token in tokens:
+        if token.token_type == TokenType.BLOCK:
+            seen_tag = True
+            yield token
+        elif token.token_type == TokenType.VAR and (
+            not seen_tag or token.contents == "block.super"
+        ):
+            yield token
+
+
+class SkeletonTemplate(Template):
+    """
+    A template that is parsed into a skeleton, see :mod:`template_analyzer.skeleton`.
+    """
+
+    def compile_nodelist(self):
+        if self.engine.debug:
+            lexer = DebugLexer(self.source)
+        else:
+            lexer = Lexer(self.source)
+
+        tokens = list(_get_skeleton_tokens(lexer.tokenize()))
+        parser = SkeletonParser(
+            tokens,
+            self.engine.template_libraries,
+            self.engine.template_builtins,
+            self.origin,
+        )
+
+        try:
+            nodelist = parser.parse()
+        except Exception as e:
+            if self.engine.debug:
+                e.template_debug = self.get_exception_info(e, e.token)
+            raise
+        self.extra_data = getattr(parser, "extra_data", {})
+        return nodelist
+
+    def render(self, context):
+        raise TemplateSyntaxError("A skeleton template can only be analyzed, not rendered.")
+
+
+def can_use_skeleton(tag_names):
+    """
+    Check whether the nodes of the given tags can be found in skeleton templates.
+
+    :param tag_names: The tag names of the searched nodes, see
+                      :func:`~template_analyzer.prefilter.get_tag_names`.
+    """
+    return tag_names is not None and tag_names.isdisjoint(SKELETON_TAG_NAMES)
+
+
+def _find_skeleton_template(engine, template_name, skip=None):
+    origin, contents = find_template_source(engine, template_name, skip)
+    return SkeletonTemplate(contents, origin, origin.template_name, engine)
+
+
+def get_skeleton_template(engine, template_name, skip=None):
+    """
+    Return the skeleton of a template.
+    The skeleton is reused until the source of the template changes.
+
+    :type engine: django.template.Engine
+    :param template_name: The template name, or a tuple of names to select the first from.
+    :param skip: The origins to skip, like ``Engine.find_template()`` does.
+    :rtype: SkeletonTemplate
+    """
+    if isinstance(template_name, tuple):
+        for name in template_name:
+            try:
+                return get_skeleton_template(engine, name, skip)
+            except TemplateDoesNotExist:
+                continue
+        raise TemplateDoesNotExist(", ".join(template_name))
+
+    try:
+        templates = _templates[engine]
+    except KeyError:
+        templates = _templates.setdefault(engine, {})
+
+    entry = templates.get(template_name)
+    if entry is not None and get_origin_signature(entry[0].origin) == entry[1]:
+        template = entry[0]
+    else:
+        template = _find_skeleton_template(engine, template_name)
+        templates[template_name] = (template, get_origin_signature(template.origin))
+
+    if skip and template.origin in skip:
+        # An {% extends %} of a template with the same name, e.g. in another directory.
+        return _find_skeleton_template(engine, template_name, skip)
+    return template
+
+
+def get_analysis_template(engine, template_name, queries):
+    """
+    Load a template to analyze it for the given queries.
+
+    When ``TEMPLATE_ANALYZER_SKELETON`` is enabled and the nodes of the queries
+    can be found in skeleton templates, the template itself is parsed as skeleton too.
+    Otherwise, the engine loads the template, e.g. from the cached loader.
+    As the nodes of a skeleton can't be rendered, its results are not stored in the
+    :class:`~template_analyzer.cache.ResultCache`.
+
+    :type engine: django.template.Engine
+    :param queries: The instances to look for, as tuple of ``(key, types)`` pairs.
+    :rtype: django.template.base.Template
+    """
+    if getattr(settings, "TEMPLATE_ANALYZER_SKELETON", False) and can_use_skeleton(
+        get_tag_names(queries)
+    ):
+        return get_skeleton_template(engine, template_name)
+    return engine.get_template(template_name)
+
+
+def get_skeleton_parent(extends_node, context):
+    """
+    Return the skeleton of the parent template of an ``{% extends %}`` node,
+    like ``ExtendsNode.get_parent()`` does.
+
+    :type extends_node: django.template.loader_tags.ExtendsNode
+    :type context: django.template.Context
+    :rtype: django.template.base.Template
+    """
+    parent = extends_node.parent_name.resolve(context)
+    if not parent or not isinstance(parent, str):
+        # Let Django report the errors, or use the given Template object.
+        return extends_node.get_parent(context)
+
+    history = context.render_context.setdefault(extends_node.context_key, [extends_node.origin])
+    template = get_skeleton_template(context.template.engine, parent, skip=history)
+    history.append(template.origin)
+    return template
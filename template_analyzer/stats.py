@@ -0,0 +1,78 @@
+"""
+Statistics of a single analysis, to find out which templates are expensive to analyze.
+"""
+
+
+class AnalysisStats:
+    """
+    The work that was done by a call to :func:`~template_analyzer.get_node_instances`.
+
+    Pass an instance as the ``stats`` argument to fill it, or connect to the
+    :data:`~template_analyzer.signals.analysis_finished` signal to receive the
+    statistics of every analysis.
+    """
+
+    def __init__(self):
+        #: The name of the analyzed template, if it has one.
+        self.template_name = None
+        #: The number of ``{% extends %}`` and ``{% include %}`` templates that were loaded,
+        #: by the name of the template loader.
+        self.templates_loaded = {}
+        #: The number of nodes that were scanned.
+        self.nodes_visited = 0
+        #: The longest ``{% extends %}`` chain.
+        self.max_extends_depth = 0
+        #: The deepest nesting of ``{% include %}`` tags.
+        self.max_include_depth = 0
+        #: The number of ``{{ block.super }}`` tags that were followed.
+        self.super_resolutions = 0
+        #: The number of ``{% include %}`` tags that reused the results of a previous scan.
+        self.includes_reused = 0
+        #: The number of ``{% include %}`` tags that were skipped by the check of the source,
+        #: see :func:`~template_analyzer.prefilter.register_tag_names`.
+        self.includes_skipped = 0
+        #: The number of results that were found in the result cache.
+        self.cache_hits = 0
+        #: The number of results that were not found in the result cache.
+        self.cache_misses = 0
+        #: The wall time of the analysis in seconds, including the time the caller
+        #: spent between the results of :func:`~template_analyzer.iter_node_instances`.
+        self.duration = 0.0
+
+    def __repr__(self):
+        return "<{} {}: {:.2f} ms, {} nodes>".format(
+            self.__class__.__name__,
+            self.template_name,
+            self.duration * 1000,
+            self.nodes_visited,
+        )
+
+    def add_template(self, template):
+        """
+        Register that a template is loaded.
+
+        :type template: django.template.base.Template
+        """
+        origin = getattr(template, "origin", None)
+        loader_name = getattr(origin, "loader_name", None)
+        self.templates_loaded[loader_name] = self.templates_loaded.get(loader_name, 0) + 1
+
+    def as_dict(self):
+        """
+        Return the statistics as dict, e.g. to send them to a metrics service.
+
+        :rtype: dict
+        """
+        return {
+            "template_name": self.template_name,
+            "templates_loaded": dict(self.templates_loaded),
+            "nodes_visited": self.nodes_visited,
+            "max_extends_depth": self.max_extends_depth,
+            "max_include_depth": self.max_include_depth,
+            "super_resolutions": self.super_resolutions,
+            "includes_reused": self.includes_reused,
+            "includes_skipped": self.includes_skipped,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "duration": self.duration,
+        }
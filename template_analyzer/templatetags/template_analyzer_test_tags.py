@@ -32,3 +32,25 @@ def placeholder(parser, token):
     A dummy placeholder template tag.
     """
     return Placeholder.parse(parser, token)
+
+
+class WrapperNode(Node):
+    """
+    A block tag that stores its contents in a custom attribute.
+    """
+
+    def __init__(self, nodelist_main):
+        self.nodelist_main = nodelist_main
+
+    def render(self, context):
+        return self.nodelist_main.render(context)
+
+
+@register.tag
+def wrapper(parser, token):
+    """
+    A dummy block tag, with a custom ``NodeList`` attribute.
+    """
+    nodelist = parser.parse(("endwrapper",))
+    parser.delete_first_token()
+    return WrapperNode(nodelist)
@@ -0,0 +1,112 @@
+import asyncio
+import sys
+import threading
+import unittest
+from unittest import mock
+
+import django
+from django.template.loader import get_template
+from django.test import SimpleTestCase
+
+if sys.version_info < (3, 7) or django.VERSION < (3, 1):
+    # The async API needs Python 3.7, and async test methods need Django 3.1.
+    raise unittest.SkipTest("The async tests need Python 3.7 and Django 3.1 or newer")
+
+from template_analyzer import asyncanalyzer, djangoanalyzer
+from template_analyzer.asyncanalyzer import (
+    afirst_node_instance,
+    aget_node_instances,
+    aget_node_instances_by_type,
+    aget_node_instances_by_variant,
+    ahas_node_instance,
+    aiter_node_instances,
+)
+from template_analyzer.cache import ResultCache
+from template_analyzer.djangoanalyzer import get_node_instances
+from template_analyzer.templatetags.template_analyzer_test_tags import Placeholder
+
+
+def get_names(nodes):
+    return [node.get_name() for node in nodes]
+
+
+class AsyncAnalyzerTestCase(SimpleTestCase):
+    def setUp(self):
+        self.template = get_template("placeholder_tests/test_one.html")
+        self.expected = get_names(get_node_instances(self.template, Placeholder, cache=False))
+
+    async def test_aget_node_instances(self):
+        nodes = await aget_node_instances(self.template, Placeholder, cache=False)
+        self.assertEqual(get_names(nodes), self.expected)
+
+        nodes = await aget_node_instances_by_type(
+            self.template, {"placeholder": Placeholder}, cache=False
+        )
+        self.assertEqual(get_names(nodes["placeholder"]), self.expected)
+
+    async def test_aget_node_instances_by_variant(self):
+        template = get_template("placeholder_tests/variable_extends.html")
+        variants = await aget_node_instances_by_variant(
+            template, Placeholder, [{"BASE_TEMPLATE": "placeholder_tests/base.html"}]
+        )
+        self.assertEqual(get_names(variants[0]), ["inside_block", "two", "three"])
+
+    async def test_aiter_node_instances(self):
+        nodes = [node async for node in aiter_node_instances(self.template, Placeholder)]
+        self.assertEqual(get_names(nodes), self.expected)
+
+        # Stopping early closes the analysis.
+        async for node in aiter_node_instances(self.template, Placeholder):
+            self.assertEqual(node.get_name(), self.expected[0])
+            break
+
+    async def test_afirst_node_instance(self):
+        node = await afirst_node_instance(self.template, Placeholder, cache=False)
+        self.assertEqual(node.get_name(), self.expected[0])
+        self.assertTrue(await ahas_node_instance(self.template, Placeholder, cache=False))
+        self.assertFalse(await ahas_node_instance(self.template, djangoanalyzer.IncludeNode))
+
+    async def test_in_flight(self):
+        """
+        Concurrent requests for the same template share a single analysis.
+        """
+        started = threading.Event()
+        release = threading.Event()
+        original = djangoanalyzer._get_node_instances
+
+        def slow_get_node_instances(*args):
+            started.set()
+            release.wait(5)
+            return original(*args)
+
+        with mock.patch.object(
+            djangoanalyzer, "_get_node_instances", side_effect=slow_get_node_instances
+        ) as mock_analyze:
+            tasks = [
+                asyncio.ensure_future(aget_node_instances(self.template, Placeholder, cache=False))
+                for i in range(5)
+            ]
+            await asyncio.sleep(0)
+            await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+            release.set()
+            results = await asyncio.gather(*tasks)
+
+        self.assertEqual(mock_analyze.call_count, 1)
+        for nodes in results:
+            self.assertEqual(get_names(nodes), self.expected)
+        self.assertEqual(asyncanalyzer._in_flight, {})
+
+    async def test_cache_hit(self):
+        """
+        Results from the cache are returned without using the thread pool.
+        """
+        cache = ResultCache()
+        nodes = await aget_node_instances(self.template, Placeholder, cache=cache)
+
+        with mock.patch.object(asyncanalyzer, "get_executor") as mock_executor:
+            self.assertEqual(
+                await aget_node_instances(self.template, Placeholder, cache=cache), nodes
+            )
+            node = await afirst_node_instance(self.template, Placeholder, cache=cache)
+            self.assertIs(node, nodes[0])
+        mock_executor.assert_not_called()
@@ -0,0 +1,177 @@
+import os
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from django.utils.autoreload import file_changed
+
+from template_analyzer import cache as cache_module
+from template_analyzer.autoreload import reanalyze
+from template_analyzer.cache import ResultCache, get_default_cache, invalidate_template
+from template_analyzer.djangoanalyzer import get_node_instances
+from template_analyzer.templatetags.template_analyzer_test_tags import Placeholder
+from template_analyzer.tests.utils import TemplateDirMixin
+
+
+class ResultCacheTestCase(TemplateDirMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write_template("base.html", '{% block one %}{% placeholder "one" %}{% endblock %}')
+        self.write_template("include.html", '{% placeholder "include" %}')
+        self.write_template(
+            "child.html",
+            '{% extends "base.html" %}{% block one %}{{ block.super }}'
+            '{% include "include.html" %}{% endblock %}',
+        )
+        self.cache = ResultCache(maxsize=10)
+
+    def test_cache_hit(self):
+        template = self.engine.get_template("child.html")
+        results1 = get_node_instances(template, Placeholder, cache=self.cache)
+        # The template, and its included template.
+        self.assertEqual(len(self.cache), 2)
+
+        # A freshly parsed template object reuses the results
+        template = self.engine.get_template("child.html")
+        results2 = get_node_instances(template, Placeholder, cache=self.cache)
+        self.assertEqual(results1, results2)
+        self.assertIs(results1[0], results2[0])
+
+    def test_cache_key_types(self):
+        self.get_placeholders("child.html", cache=self.cache)
+        template = self.engine.get_template("child.html")
+        get_node_instances(template, (Placeholder,), cache=self.cache)
+        self.assertEqual(len(self.cache), 2)
+
+    def test_invalidate_parent(self):
+        self.assertEqual(self.get_placeholders("child.html", cache=self.cache), ["one", "include"])
+        self.write_template(
+            "base.html", '{% block one %}{% placeholder "changed" %}{% endblock %}'
+        )
+        self.assertEqual(
+            self.get_placeholders("child.html", cache=self.cache), ["changed", "include"]
+        )
+
+    def test_invalidate_include(self):
+        self.assertEqual(self.get_placeholders("child.html", cache=self.cache), ["one", "include"])
+        self.write_template("include.html", '{% placeholder "changed" %}')
+        self.assertEqual(self.get_placeholders("child.html", cache=self.cache), ["one", "changed"])
+
+    def test_invalidate_removed(self):
+        self.get_placeholders("child.html", cache=self.cache)
+        template = self.engine.get_template("child.html").template
+        os.unlink(os.path.join(self.template_dir, "include.html"))
+        key = self.cache.make_key(template, [(None, Placeholder)])
+        self.assertIsNone(self.cache.get(key))
+        self.assertNotIn(key, self.cache._entries)
+
+    def test_include_reused(self):
+        self.get_placeholders("child.html", cache=self.cache)
+        include_key = self.cache.make_include_key(
+            self.engine.engine, "include.html", [(None, Placeholder)]
+        )
+        self.assertIsNotNone(self.cache.get(include_key))
+
+        # Another template that includes the same template reuses its results.
+        self.write_template(
+            "other.html", '{% block two %}{% include "include.html" %}{% endblock %}'
+        )
+        with mock.patch.object(ResultCache, "set") as mock_set:
+            self.assertEqual(self.get_placeholders("other.html", cache=self.cache), ["include"])
+        self.assertEqual(mock_set.call_count, 1)
+
+        # The results are only cached without block.super, which depends on the current block.
+        self.write_template("super.html", "{{ block.super }}")
+        self.write_template(
+            "super_child.html",
+            '{% extends "base.html" %}{% block one %}{% include "super.html" %}{% endblock %}',
+        )
+        self.assertEqual(self.get_placeholders("super_child.html", cache=self.cache), ["one"])
+        include_key = self.cache.make_include_key(
+            self.engine.engine, "super.html", [(None, Placeholder)]
+        )
+        self.assertIsNone(self.cache.get(include_key))
+
+    def test_lru_eviction(self):
+        self.cache = ResultCache(maxsize=2)
+        self.get_placeholders("child.html", cache=self.cache)
+        self.get_placeholders("base.html", cache=self.cache)
+        self.get_placeholders("child.html", cache=self.cache)  # mark as recently used
+        self.get_placeholders("include.html", cache=self.cache)
+        self.assertEqual(len(self.cache), 2)
+
+        keys = list(self.cache._entries.keys())
+        self.assertEqual(
+            [key[1] for key in keys],
+            [
+                os.path.join(self.template_dir, "child.html"),
+                os.path.join(self.template_dir, "include.html"),
+            ],
+        )
+
+    def test_dependents(self):
+        self.get_placeholders("child.html", cache=self.cache)
+        self.get_placeholders("base.html", cache=self.cache)
+        child_key = self.cache.make_key(
+            self.engine.get_template("child.html").template, [(None, Placeholder)]
+        )
+        base_path = os.path.join(self.template_dir, "base.html")
+        self.assertEqual(len(self.cache.get_dependents(base_path)), 2)
+        self.assertIn(child_key, self.cache.get_dependents(base_path))
+
+        # Only the entries that depend on the template are removed.
+        removed = invalidate_template(os.path.join(self.template_dir, "include.html"))
+        self.assertEqual(len(removed), 2)
+        self.assertIn((self.cache, child_key), [(cache, key) for cache, key, origins in removed])
+        self.assertEqual(len(self.cache), 1)
+        self.assertEqual(self.cache.get_dependents(base_path), {next(iter(self.cache._entries))})
+
+    def test_dependents_eviction(self):
+        self.cache = ResultCache(maxsize=1)
+        self.get_placeholders("child.html", cache=self.cache)
+        self.assertEqual(len(self.cache), 1)
+        self.assertEqual(
+            self.cache.get_dependents(os.path.join(self.template_dir, "base.html")),
+            set(self.cache._entries),
+        )
+        self.cache.clear()
+        self.assertEqual(self.cache._dependents, {})
+
+    def test_file_changed(self):
+        self.get_placeholders("child.html", cache=self.cache)
+        file_changed.send(sender=None, file_path=Path(self.template_dir) / "base.html")
+        self.assertEqual(len(self.cache), 1)  # only include.html
+
+    def test_reanalyze(self):
+        self.get_placeholders("child.html", cache=self.cache)
+        self.write_template(
+            "base.html", '{% block one %}{% placeholder "changed" %}{% endblock %}'
+        )
+        removed = invalidate_template(os.path.join(self.template_dir, "base.html"))
+        reanalyze(removed)
+
+        template = self.engine.get_template("child.html").template
+        key = self.cache.make_key(template, [(None, Placeholder)])
+        results = self.cache.get(key)
+        self.assertEqual([node.get_name() for k, node, block in results], ["changed", "include"])
+
+    def test_no_origin(self):
+        from django.template import Template
+
+        template = Template('{% load template_analyzer_test_tags %}{% placeholder "one" %}')
+        get_node_instances(template, Placeholder, cache=self.cache)
+        self.assertEqual(len(self.cache), 0)
+
+
+class DefaultCacheTestCase(SimpleTestCase):
+    def tearDown(self):
+        cache_module._default_cache = None
+
+    def test_disabled_by_default(self):
+        self.assertIsNone(get_default_cache())
+
+    @override_settings(TEMPLATE_ANALYZER_CACHE_SIZE=5)
+    def test_enabled(self):
+        cache = get_default_cache()
+        self.assertEqual(cache.maxsize, 5)
+        self.assertIs(get_default_cache(), cache)
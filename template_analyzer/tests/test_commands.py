@@ -0,0 +1,137 @@
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.template import engines
+from django.template.loader import get_template
+from django.test import SimpleTestCase
+
+from template_analyzer.cache import get_source_hash
+from template_analyzer.discovery import find_templates, iter_template_names
+
+PLACEHOLDER = "template_analyzer.templatetags.template_analyzer_test_tags.Placeholder"
+
+
+class DiscoveryTestCase(SimpleTestCase):
+    def test_iter_template_names(self):
+        names = list(iter_template_names(engines["django"].engine))
+        self.assertIn("placeholder_tests/base.html", names)
+        self.assertIn("placeholder_tests/nested_super_level4.html", names)
+        self.assertEqual(len(names), len(set(names)))
+
+    def test_find_templates(self):
+        templates = list(find_templates())
+        self.assertIn(("django", "placeholder_tests/test_one.html"), templates)
+        self.assertEqual(list(find_templates(using="other")), [])
+
+
+class AnalyzeTemplatesTestCase(SimpleTestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+        self.output = os.path.join(self.output_dir, "manifest.json")
+
+    def call_command(self, *args, **kwargs):
+        stderr = StringIO()
+        call_command("analyze_templates", *args, output=self.output, stderr=stderr, **kwargs)
+        with open(self.output) as f:
+            return json.load(f), stderr.getvalue()
+
+    def assertManifest(self, manifest):
+        self.assertEqual(manifest["version"], 1)
+        self.assertEqual(manifest["node_types"], [PLACEHOLDER])
+
+        templates = manifest["templates"]
+        nodes = templates["placeholder_tests/test_four.html"]["nodes"]
+        self.assertEqual(
+            nodes,
+            [
+                {
+                    "type": PLACEHOLDER,
+                    "name": "four",
+                    "block": "subblockthree",
+                    "template": "placeholder_tests/test_four.html",
+                    "line": 16,
+                    "position": None,
+                },
+                {
+                    "type": PLACEHOLDER,
+                    "name": "child",
+                    "block": "two",
+                    "template": "placeholder_tests/child.html",
+                    "line": 3,
+                    "position": None,
+                },
+                {
+                    "type": PLACEHOLDER,
+                    "name": "new_one",
+                    "block": "one",
+                    "template": "placeholder_tests/test_one.html",
+                    "line": 14,
+                    "position": None,
+                },
+            ],
+        )
+
+        outside = templates["placeholder_tests/outside.html"]["nodes"]
+        self.assertEqual(
+            [(node["name"], node["block"]) for node in outside],
+            [("new_one", "one"), ("two", "two"), ("base_outside", None)],
+        )
+
+        self.assertEqual(
+            templates["placeholder_tests/test_four.html"]["sources"],
+            [
+                [
+                    name,
+                    get_template(name).origin.name,
+                    get_template(name).origin.loader_name,
+                    get_source_hash(get_template(name).template.source),
+                ]
+                for name in (
+                    "placeholder_tests/test_four.html",
+                    "placeholder_tests/test_three.html",
+                    "placeholder_tests/test_one.html",
+                    "placeholder_tests/base.html",
+                    "placeholder_tests/child.html",
+                )
+            ],
+        )
+
+        self.assertEqual(
+            templates["placeholder_tests/tag_exception.html"],
+            {
+                "engine": "django",
+                "error": "TemplateSyntaxError: placeholder tag requires 2 arguments",
+            },
+        )
+
+    def test_analyze_templates(self):
+        manifest, stderr = self.call_command(PLACEHOLDER, jobs=1)
+        self.assertManifest(manifest)
+        self.assertIn("placeholder_tests/tag_exception.html: TemplateSyntaxError", stderr)
+        self.assertIn("Analyzed {0}/{0} templates".format(len(manifest["templates"])), stderr)
+
+    @unittest.skipUnless(
+        multiprocessing.get_start_method() == "fork",
+        "Worker processes need to inherit the test settings",
+    )
+    def test_analyze_templates_jobs(self):
+        manifest, stderr = self.call_command(PLACEHOLDER, jobs=2)
+        self.assertManifest(manifest)
+
+    def test_indent(self):
+        stdout = StringIO()
+        call_command(
+            "analyze_templates", PLACEHOLDER, jobs=1, indent=2, stdout=stdout, stderr=StringIO()
+        )
+        self.assertTrue(stdout.getvalue().startswith('{\n  "version": 1,'))
+
+    def test_invalid_node_type(self):
+        with self.assertRaises(CommandError):
+            call_command("analyze_templates", "template_analyzer.DoesNotExist")
@@ -0,0 +1,106 @@
+from unittest import mock
+
+from django.template.loader import get_template
+from django.test import SimpleTestCase
+
+from template_analyzer import djangoanalyzer
+from template_analyzer.djangoanalyzer import get_block_map, get_node_instances
+from template_analyzer.inheritance import ResolvedInheritance
+from template_analyzer.templatetags.template_analyzer_test_tags import Placeholder
+from template_analyzer.tests.utils import get_locmem_engine
+
+
+class BlockMapTestCase(SimpleTestCase):
+    def test_get_block_map(self):
+        template = get_template("placeholder_tests/test_two.html")
+        inheritance = get_block_map(template)
+        self.assertIsInstance(inheritance, ResolvedInheritance)
+        self.assertEqual(list(inheritance.blocks), ["one", "two", "three"])
+        self.assertEqual(inheritance.block_names, {"one", "two", "three"})
+        self.assertEqual(
+            [t.origin.template_name for t in inheritance.templates],
+            ["placeholder_tests/base.html"],
+        )
+        self.assertIs(inheritance.topmost_template, inheritance.templates[-1])
+
+        # The blocks of the child template replace the blocks of the parent.
+        self.assertEqual(
+            inheritance.blocks["one"].origin.template_name, "placeholder_tests/test_two.html"
+        )
+        self.assertEqual(
+            inheritance.blocks["three"].origin.template_name, "placeholder_tests/base.html"
+        )
+        self.assertFalse(
+            any(node.__class__.__name__ == "BlockNode" for node in inheritance.get_outside_nodes())
+        )
+
+    def test_super_chain(self):
+        template = get_template("placeholder_tests/nested_super_level1.html")
+        inheritance = get_block_map(template)
+        self.assertEqual(len(inheritance.templates), 3)
+        chain = inheritance.get_super_chain("one")
+        self.assertEqual(
+            [block.origin.template_name for block in chain],
+            [
+                "placeholder_tests/nested_super_level1.html",
+                "placeholder_tests/nested_super_level2.html",
+                "placeholder_tests/nested_super_level3.html",
+                "placeholder_tests/nested_super_level4.html",
+            ],
+        )
+        self.assertEqual(inheritance.get_super_chain("missing"), [])
+
+    def test_no_extends(self):
+        template = get_template("placeholder_tests/base.html")
+        inheritance = get_block_map(template)
+        self.assertEqual(inheritance.templates, [template.template])
+        self.assertEqual(list(inheritance.blocks), ["one", "two", "three"])
+        self.assertEqual(inheritance.supers, {})
+
+    def test_variable_extends(self):
+        template = get_template("placeholder_tests/variable_extends.html")
+        self.assertIsNone(get_block_map(template))
+
+        inheritance = get_block_map(template, {"BASE_TEMPLATE": "placeholder_tests/base.html"})
+        self.assertTrue(inheritance.is_variable)
+        self.assertEqual(
+            inheritance.topmost_template.origin.template_name, "placeholder_tests/base.html"
+        )
+
+    def test_shared_with_cached_loader(self):
+        """
+        The resolved chain is reused by the next analysis of the template.
+        """
+        engine = get_locmem_engine(
+            {
+                "base.html": '{% load template_analyzer_test_tags %}{% placeholder "base" %}'
+                "{% block content %}{% endblock %}",
+                "page.html": '{% extends "base.html" %}{% load template_analyzer_test_tags %}'
+                '{% block content %}{% placeholder "page" %}{% endblock %}',
+            },
+            cached=True,
+        )
+        template = engine.get_template("page.html")
+        inheritance = get_block_map(template)
+        self.assertIs(get_block_map(template), inheritance)
+
+        names = [node.get_name() for node in get_node_instances(template, Placeholder)]
+        self.assertEqual(names, ["page", "base"])
+
+        # The analysis doesn't resolve the chain again.
+        with mock.patch.object(djangoanalyzer._Analysis, "_resolve_inheritance") as resolve:
+            get_node_instances(template, Placeholder)
+        self.assertFalse(resolve.called)
+
+        # Unless caching is disabled.
+        names = [node.get_name() for node in get_node_instances(template, Placeholder, False)]
+        self.assertEqual(names, ["page", "base"])
+        with mock.patch.object(
+            djangoanalyzer._Analysis, "_resolve_inheritance", return_value=inheritance
+        ) as resolve:
+            get_node_instances(template, Placeholder, False)
+        self.assertTrue(resolve.called)
+
+    def test_not_shared_without_cached_loader(self):
+        template = get_template("placeholder_tests/test_two.html")
+        self.assertIsNot(get_block_map(template), get_block_map(template))
@@ -0,0 +1,133 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from template_analyzer import manifest as manifest_module
+from template_analyzer.manifest import (
+    Manifest,
+    analyze_template,
+    create_manifest,
+    get_default_manifest,
+)
+from template_analyzer.tests.utils import TemplateDirMixin
+
+PLACEHOLDER = "template_analyzer.templatetags.template_analyzer_test_tags.Placeholder"
+
+
+class ManifestTestCase(TemplateDirMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        settings_override = override_settings(
+            TEMPLATES=[
+                {
+                    "BACKEND": "django.template.backends.django.DjangoTemplates",
+                    "DIRS": [self.template_dir],
+                    "OPTIONS": {"loaders": ["django.template.loaders.filesystem.Loader"]},
+                }
+            ]
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.write_template("base.html", '{% block one %}{% placeholder "one" %}{% endblock %}')
+        self.write_template("include.html", '{% placeholder "include" %}')
+        self.write_template(
+            "child.html",
+            '{% extends "base.html" %}{% block one %}{{ block.super }}'
+            '{% include "include.html" %}{% endblock %}',
+        )
+
+    def get_manifest(self, *names):
+        return Manifest(
+            create_manifest(
+                [PLACEHOLDER],
+                [(name, analyze_template("django", name, [PLACEHOLDER])) for name in names],
+            )
+        )
+
+    def get_names(self, nodes):
+        return [node["name"] for node in nodes]
+
+    def test_manifest_lookup(self):
+        manifest = self.get_manifest("child.html")
+        self.assertEqual(
+            manifest.templates["child.html"]["sources"],
+            [
+                [
+                    "child.html",
+                    os.path.join(self.template_dir, "child.html"),
+                    "django.template.loaders.filesystem.Loader",
+                    mock.ANY,
+                ],
+                [
+                    "base.html",
+                    os.path.join(self.template_dir, "base.html"),
+                    "django.template.loaders.filesystem.Loader",
+                    mock.ANY,
+                ],
+                [
+                    "include.html",
+                    os.path.join(self.template_dir, "include.html"),
+                    "django.template.loaders.filesystem.Loader",
+                    mock.ANY,
+                ],
+            ],
+        )
+
+        with mock.patch.object(manifest_module, "_get_node_instances") as mock_analyze:
+            nodes = manifest.get_nodes("child.html")
+        self.assertEqual(self.get_names(nodes), ["one", "include"])
+        self.assertEqual(nodes[1]["block"], "one")
+        mock_analyze.assert_not_called()
+
+    def test_outdated_template(self):
+        manifest = self.get_manifest("child.html")
+        self.write_template("include.html", '{% placeholder "changed" %}')
+        self.assertFalse(manifest.is_current("child.html"))
+        self.assertEqual(self.get_names(manifest.get_nodes("child.html")), ["one", "changed"])
+
+    def test_overridden_template(self):
+        # A template that extends the template with the same name in another directory.
+        override_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, override_dir)
+        with open(os.path.join(override_dir, "base.html"), "w") as f:
+            f.write('{% extends "base.html" %}{% block one %}{{ block.super }}{% endblock %}')
+
+        with override_settings(
+            TEMPLATES=[
+                {
+                    "BACKEND": "django.template.backends.django.DjangoTemplates",
+                    "DIRS": [override_dir, self.template_dir],
+                    "OPTIONS": {"loaders": ["django.template.loaders.filesystem.Loader"]},
+                }
+            ]
+        ):
+            manifest = self.get_manifest("base.html")
+            self.assertEqual(len(manifest.templates["base.html"]["sources"]), 2)
+            self.assertTrue(manifest.is_current("base.html"))
+
+    def test_missing_template(self):
+        manifest = self.get_manifest("child.html")
+        self.assertFalse(manifest.is_current("base.html"))
+        self.assertEqual(self.get_names(manifest.get_nodes("base.html")), ["one"])
+
+    def test_version(self):
+        with self.assertRaises(ValueError):
+            Manifest({"version": 0})
+
+    def test_default_manifest(self):
+        self.addCleanup(setattr, manifest_module, "_default_manifest", None)
+        self.assertIsNone(get_default_manifest())
+
+        path = os.path.join(self.template_dir, "manifest.json")
+        with open(path, "w") as f:
+            json.dump(create_manifest([PLACEHOLDER], []), f)
+
+        with self.settings(TEMPLATE_ANALYZER_MANIFEST=path):
+            manifest = get_default_manifest()
+            self.assertEqual(manifest.node_types, [PLACEHOLDER])
+            self.assertIs(get_default_manifest(), manifest)
@@ -0,0 +1,83 @@
+from django.template import NodeList, Variable
+from django.template.defaulttags import ForNode
+from django.template.loader import get_template
+from django.test import SimpleTestCase
+
+from template_analyzer.djangoanalyzer import get_node_instances
+from template_analyzer.nodelists import (
+    get_child_nodelists,
+    register_child_nodelists,
+    unregister_child_nodelists,
+)
+from template_analyzer.templatetags.template_analyzer_test_tags import Placeholder, WrapperNode
+
+
+class CustomObject:
+    """
+    An object without a 'child_nodelists' attribute.
+    """
+
+    property_reads = 0
+
+    def __init__(self, contents=None):
+        self.contents = NodeList() if contents is None else contents
+        self.other = "text"
+
+    @property
+    def expensive(self):
+        CustomObject.property_reads += 1
+        return None
+
+
+class SlotsObject:
+    """
+    An object that stores its attributes in slots.
+    """
+
+    __slots__ = ("contents",)
+
+    def __init__(self, contents):
+        self.contents = contents
+
+
+class ChildNodelistsTestCase(SimpleTestCase):
+    def test_django_nodes(self):
+        self.assertEqual(
+            get_child_nodelists(ForNode(["x"], None, False, NodeList(), NodeList())),
+            ("nodelist_loop", "nodelist_empty"),
+        )
+
+    def test_inspect_once(self):
+        CustomObject.property_reads = 0
+        self.assertEqual(get_child_nodelists(CustomObject()), ("contents", "other"))
+        self.assertEqual(get_child_nodelists(CustomObject()), ("contents", "other"))
+        self.assertEqual(CustomObject.property_reads, 0)
+
+    def test_inspect_empty_first(self):
+        # The first instance doesn't hold a NodeList, a later one does.
+        self.assertEqual(get_child_nodelists(SlotsObject(None)), ("contents",))
+        self.assertEqual(get_child_nodelists(SlotsObject(NodeList())), ("contents",))
+
+        placeholder = Placeholder(Variable("found"))
+        nodelist = NodeList([SlotsObject(None), SlotsObject(NodeList([placeholder]))])
+        self.assertEqual(get_node_instances(nodelist, Placeholder, cache=False), [placeholder])
+
+    def test_register(self):
+        template = get_template("placeholder_tests/custom_nodelist.html")
+        placeholders = get_node_instances(template, Placeholder)
+        self.assertEqual([p.get_name() for p in placeholders], ["outside"])
+
+        register_child_nodelists(WrapperNode, ["nodelist_main"])
+        self.addCleanup(unregister_child_nodelists, WrapperNode)
+        self.assertEqual(get_child_nodelists(WrapperNode(NodeList())), ("nodelist_main",))
+
+        placeholders = get_node_instances(template, Placeholder)
+        self.assertEqual([p.get_name() for p in placeholders], ["outside", "wrapped"])
+
+    def test_register_subclass(self):
+        class SubWrapperNode(WrapperNode):
+            pass
+
+        register_child_nodelists(WrapperNode, ["nodelist_main"])
+        self.addCleanup(unregister_child_nodelists, WrapperNode)
+        self.assertEqual(get_child_nodelists(SubWrapperNode(NodeList())), ("nodelist_main",))
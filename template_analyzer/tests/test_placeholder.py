@@ -1,10 +1,25 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
 from django.template import Context
 from django.template.base import TemplateSyntaxError
 from django.template.loader import get_template
+from django.template.loader_tags import BlockNode, IncludeNode
+from django.test import override_settings
 from django.test.testcases import TestCase
 
-from template_analyzer.djangoanalyzer import get_node_instances
+from template_analyzer import djangoanalyzer
+from template_analyzer.cache import ResultCache
+from template_analyzer.djangoanalyzer import (
+    first_node_instance,
+    get_node_instances,
+    get_node_instances_by_type,
+    has_node_instance,
+    iter_node_instances,
+)
 from template_analyzer.templatetags.template_analyzer_test_tags import Placeholder
+from template_analyzer.tests.utils import get_locmem_engine
 
 
 def get_placeholders(filename):
@@ -17,6 +32,25 @@ def get_placeholders_in_template(template):
     return [p.get_name() for p in placeholders]
 
 
+class RecordingAnalysis(djangoanalyzer._Analysis):
+    """
+    Keep a reference to the analysis state, to inspect it afterwards.
+    """
+
+    instances = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.instances.append(self)
+
+
+def get_analysis(filename):
+    RecordingAnalysis.instances = []
+    with mock.patch.object(djangoanalyzer, "_Analysis", RecordingAnalysis):
+        get_placeholders(filename)
+    return RecordingAnalysis.instances[0]
+
+
 class PlaceholderTestCase(TestCase):
     def test_placeholder_scanning_extend(self):
         placeholders = get_placeholders("placeholder_tests/test_one.html")
@@ -93,6 +127,16 @@ class PlaceholderTestCase(TestCase):
             }
         )
 
+    def _get_cached_engine(self):
+        return self._get_custom_engine(
+            loaders=[
+                (
+                    "django.template.loaders.cached.Loader",
+                    ["django.template.loaders.app_directories.Loader"],
+                )
+            ]
+        )
+
     def test_custom_loader(self):
         """
         When the application uses a custom loader, make sure the template analyzer uses that to find extends nodes.
@@ -129,3 +173,261 @@ class PlaceholderTestCase(TestCase):
         # see if the block structure is altered
         result2 = template.render(context)
         self.assertEqual(result1, result2)
+
+    def test_load_parents_once(self):
+        # nested_super_level1.html has an inheritance chain of 3 parent templates.
+        analysis = get_analysis("placeholder_tests/nested_super_level1.html")
+        self.assertEqual(analysis.templates_loaded, 3)
+        self.assertEqual(len(analysis.origins), 4)
+
+    def test_load_includes_once(self):
+        placeholders = get_placeholders("placeholder_tests/include_twice.html")
+        self.assertEqual(placeholders, ["child", "child", "three"])
+
+        analysis = get_analysis("placeholder_tests/include_twice.html")
+        self.assertEqual(analysis.templates_loaded, 2)
+
+    def test_scan_includes_once(self):
+        analysis = get_analysis("placeholder_tests/include_twice.html")
+        # The parent template, and the included template only once.
+        self.assertEqual(analysis.templates_visited, 2)
+
+        # The replayed results still refer to the block they are included from.
+        template = get_template("placeholder_tests/include_twice.html")
+        results = djangoanalyzer._get_node_instances(template, ((None, Placeholder),), False)
+        self.assertEqual(
+            [(node.get_name(), block.name) for key, node, block in results],
+            [("child", "one"), ("child", "two"), ("three", "three")],
+        )
+
+    def test_blocks_not_modified(self):
+        """
+        The analyzer should not alter the parsed templates, as these could be shared by the cached loader.
+        """
+        engine = self._get_cached_engine()
+        template = engine.get_template("placeholder_tests/nested_super_level1.html")
+        for i in range(2):
+            placeholders = get_placeholders_in_template(template)
+            self.assertEqual(placeholders, ["level1", "level2", "level3", "level4"])
+
+        for level in range(1, 5):
+            parent = engine.get_template(
+                "placeholder_tests/nested_super_level{}.html".format(level)
+            )
+            for block in parent.template.nodelist.get_nodes_by_type(BlockNode):
+                self.assertIsNone(block.parent)
+
+    def test_concurrent_analysis(self):
+        engine = self._get_cached_engine()
+        names = [
+            "placeholder_tests/nested_super_level1.html",
+            "placeholder_tests/nested_super_level2.html",
+            "placeholder_tests/test_five.html",
+            "placeholder_tests/test_four.html",
+        ]
+
+        def analyze(name):
+            return get_placeholders_in_template(engine.get_template(name))
+
+        expected = [analyze(name) for name in names]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(analyze, names * 25))
+        self.assertEqual(results, expected * 25)
+
+    def test_by_type(self):
+        # The cached loader returns the same node objects for each call.
+        template = self._get_cached_engine().get_template("placeholder_tests/test_four.html")
+        results = get_node_instances_by_type(
+            template, {"placeholder": Placeholder, "include": IncludeNode, "block": BlockNode}
+        )
+        self.assertEqual(list(results.keys()), ["placeholder", "include", "block"])
+        self.assertEqual(
+            [p.get_name() for p in results["placeholder"]], ["four", "child", "new_one"]
+        )
+
+        # Same results as separate calls, even when nodes are found inside other found nodes.
+        self.assertEqual(results["placeholder"], get_node_instances(template, Placeholder))
+        self.assertEqual(results["include"], get_node_instances(template, IncludeNode))
+        self.assertEqual(results["block"], get_node_instances(template, BlockNode))
+
+    def test_by_type_single_scan(self):
+        RecordingAnalysis.instances = []
+        with mock.patch.object(djangoanalyzer, "_Analysis", RecordingAnalysis):
+            template = get_template("placeholder_tests/nested_super_level1.html")
+            results = get_node_instances_by_type(
+                template, {"placeholder": Placeholder, "include": IncludeNode}
+            )
+        self.assertEqual(len(RecordingAnalysis.instances), 1)
+        self.assertEqual(
+            [p.get_name() for p in results["placeholder"]],
+            ["level1", "level2", "level3", "level4"],
+        )
+        self.assertEqual(results["include"], [])
+
+    def test_iter_node_instances(self):
+        for name in (
+            "test_one",
+            "test_four",
+            "test_five",
+            "outside_nested",
+            "nested_super_level1",
+        ):
+            template = get_template("placeholder_tests/{}.html".format(name))
+            self.assertEqual(
+                [p.get_name() for p in iter_node_instances(template, Placeholder)],
+                get_placeholders_in_template(template),
+            )
+
+    def test_has_node_instance(self):
+        self.assertTrue(
+            has_node_instance(get_template("placeholder_tests/test_one.html"), Placeholder)
+        )
+        self.assertFalse(
+            has_node_instance(get_template("placeholder_tests/variable_extends.html"), Placeholder)
+        )
+        self.assertFalse(
+            has_node_instance(get_template("placeholder_tests/test_one.html"), IncludeNode)
+        )
+
+    def test_first_node_instance(self):
+        RecordingAnalysis.instances = []
+        with mock.patch.object(djangoanalyzer, "_Analysis", RecordingAnalysis):
+            template = get_template("placeholder_tests/test_four.html")
+            placeholder = first_node_instance(template, Placeholder)
+        self.assertEqual(placeholder.get_name(), "four")
+
+        # The included child.html is not loaded, only the 3 parent templates.
+        analysis = RecordingAnalysis.instances[0]
+        self.assertEqual(analysis.templates_loaded, 3)
+        self.assertNotIn("child.html", str(list(analysis.origins)))
+
+        template = get_template("placeholder_tests/variable_extends.html")
+        self.assertIsNone(first_node_instance(template, Placeholder))
+
+    def test_iter_node_instances_cache(self):
+        cache = ResultCache()
+        template = get_template("placeholder_tests/test_four.html")
+        self.assertIsNotNone(first_node_instance(template, Placeholder, cache=cache))
+        self.assertEqual(len(cache), 0)
+
+        list(iter_node_instances(template, Placeholder, cache=cache))
+        # The template, and its included template.
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(
+            first_node_instance(template, Placeholder, cache=cache).get_name(), "four"
+        )
+
+    @override_settings(TEMPLATE_ANALYZER_MAX_DEPTH=None)
+    def test_deep_nesting(self):
+        """
+        Long include and extends chains don't reach the recursion limit.
+        """
+        depth = sys.getrecursionlimit() + 100
+        templates = {
+            "include{}.html".format(i): (
+                '{{% load template_analyzer_test_tags %}}{{% placeholder "i{0}" %}}'
+                '{{% include "include{1}.html" %}}'.format(i, i + 1)
+            )
+            for i in range(depth)
+        }
+        templates["include{}.html".format(depth)] = ""
+        templates.update(
+            {
+                "extends{}.html".format(i): (
+                    '{{% extends "extends{1}.html" %}}{{% load template_analyzer_test_tags %}}'
+                    '{{% block b %}}{{% placeholder "e{0}" %}}{{{{ block.super }}}}{{% endblock %}}'
+                ).format(i, i + 1)
+                for i in range(depth)
+            }
+        )
+        templates["extends{}.html".format(depth)] = "{% block b %}{% endblock %}"
+        engine = get_locmem_engine(templates)
+
+        placeholders = get_placeholders_in_template(engine.get_template("include0.html"))
+        self.assertEqual(placeholders, ["i{}".format(i) for i in range(depth)])
+
+        placeholders = get_placeholders_in_template(engine.get_template("extends0.html"))
+        self.assertEqual(placeholders, ["e{}".format(i) for i in range(depth)])
+
+    def test_max_depth(self):
+        engine = get_locmem_engine(
+            {"recursive.html": '{% if menu %}{% include "recursive.html" %}{% endif %}'}
+        )
+        template = engine.get_template("recursive.html")
+        with self.assertRaisesMessage(TemplateSyntaxError, "maximum depth of 100"):
+            get_placeholders_in_template(template)
+
+    @override_settings(TEMPLATE_ANALYZER_MAX_TEMPLATES=1)
+    def test_max_templates(self):
+        with self.assertRaisesMessage(TemplateSyntaxError, "maximum of 1 visited templates"):
+            get_placeholders("placeholder_tests/include_twice.html")
+
+    def _get_variant_engine(self):
+        load = "{% load template_analyzer_test_tags %}"
+        body = (
+            load + '{% block content %}{% placeholder "content" %}{% include "partial.html" %}'
+            '{% endblock %}{% block header %}{{ block.super }}{% placeholder "header" %}'
+            "{% endblock %}{% block sidebar %}{% include partial_name %}{% endblock %}"
+        )
+        return get_locmem_engine(
+            {
+                "layout1.html": load + '{% block header %}{% placeholder "header1" %}'
+                '{% endblock %}{% block content %}{% endblock %}{% placeholder "footer1" %}',
+                "layout2.html": load + '{% placeholder "top2" %}{% block header %}{% endblock %}'
+                '{% block content %}{% placeholder "default2" %}{% endblock %}',
+                "partial.html": load + '{% placeholder "partial" %}',
+                "sidebar.html": load + '{% placeholder "sidebar" %}',
+                "page.html": "{% extends base_template %}" + body,
+                "page1.html": '{% extends "layout1.html" %}' + body,
+                "page2.html": '{% extends "layout2.html" %}' + body,
+            }
+        )
+
+    def test_variable_include_skipped(self):
+        engine = self._get_variant_engine()
+        placeholders = get_placeholders_in_template(engine.get_template("page1.html"))
+        self.assertEqual(placeholders, ["content", "partial", "header1", "header", "footer1"])
+
+    def test_variants(self):
+        engine = self._get_variant_engine()
+        template = engine.get_template("page.html")
+        RecordingAnalysis.instances = []
+        with mock.patch.object(djangoanalyzer, "_Analysis", RecordingAnalysis):
+            variants = djangoanalyzer.get_node_instances_by_variant(
+                template,
+                Placeholder,
+                [{"base_template": "layout1.html"}, {"base_template": "layout2.html"}],
+            )
+
+        # The results are the same as for a template that extends the layout directly.
+        for nodes, name in zip(variants, ["page1.html", "page2.html"]):
+            self.assertEqual(
+                [node.get_name() for node in nodes],
+                get_placeholders_in_template(engine.get_template(name)),
+            )
+
+        # The content block is only scanned for the first variant, the included template too.
+        # The header block is scanned twice, as it uses {{ block.super }},
+        # and the sidebar block too, as it depends on the variables.
+        first, second = RecordingAnalysis.instances
+        self.assertEqual(first.templates_visited, 2)
+        self.assertEqual(second.templates_visited, 1)
+
+    def test_variants_include(self):
+        engine = self._get_variant_engine()
+        template = engine.get_template("page.html")
+        variants = djangoanalyzer.get_node_instances_by_variant(
+            template,
+            Placeholder,
+            [
+                {"base_template": "layout1.html", "partial_name": "sidebar.html"},
+                {"base_template": "layout1.html"},
+            ],
+        )
+        self.assertEqual(
+            [[node.get_name() for node in nodes] for nodes in variants],
+            [
+                ["content", "partial", "header1", "header", "sidebar", "footer1"],
+                ["content", "partial", "header1", "header", "footer1"],
+            ],
+        )
@@ -0,0 +1,85 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from template_analyzer.cache import ResultCache
+from template_analyzer.djangoanalyzer import get_node_instances
+from template_analyzer.prefilter import (
+    get_source_info,
+    get_tag_names,
+    register_tag_names,
+    unregister_tag_names,
+)
+from template_analyzer.stats import AnalysisStats
+from template_analyzer.templatetags.template_analyzer_test_tags import Placeholder, WrapperNode
+from template_analyzer.tests.utils import get_locmem_engine
+
+LOAD = "{% load template_analyzer_test_tags %}"
+
+
+def get_names(template, cache=False, stats=None):
+    return [node.get_name() for node in get_node_instances(template, Placeholder, cache, stats)]
+
+
+class PrefilterTestCase(SimpleTestCase):
+    def setUp(self):
+        register_tag_names(Placeholder, ("placeholder",))
+        self.addCleanup(unregister_tag_names, Placeholder)
+        self.templates = {
+            "page.html": LOAD + '{% placeholder "page" %}{% include "icon.html" %}'
+            '{% include "partial.html" %}{% include "nested.html" %}',
+            "icon.html": "<svg>{% if x %}{{ x }}{% endif %}</svg>",
+            "partial.html": LOAD + '{% placeholder "partial" %}',
+            "nested.html": '{% include "partial.html" %}',
+        }
+        self.engine = get_locmem_engine(self.templates)
+
+    def test_get_tag_names(self):
+        self.assertEqual(get_tag_names(((None, Placeholder),)), {"placeholder"})
+        self.assertIsNone(get_tag_names(((None, (Placeholder, WrapperNode)),)))
+
+    def test_get_source_info(self):
+        source = get_source_info(self.engine.engine, "page.html")
+        self.assertIn("placeholder", source.tag_names)
+        self.assertEqual(source.templates, ["icon.html", "partial.html", "nested.html"])
+        self.assertFalse(source.is_dynamic)
+        self.assertIsNone(get_source_info(self.engine.engine, "missing.html"))
+
+    def test_skip_include(self):
+        stats = AnalysisStats()
+        template = self.engine.get_template("page.html")
+        with mock.patch.object(
+            self.engine.engine, "get_template", wraps=self.engine.engine.get_template
+        ) as get_template:
+            names = get_names(template, stats=stats)
+
+        self.assertEqual(names, ["page", "partial", "partial"])
+        self.assertEqual(stats.includes_skipped, 1)
+        loaded = [call[0][0] for call in get_template.call_args_list]
+        self.assertNotIn("icon.html", loaded)
+
+    def test_dynamic(self):
+        # The variable include is not followed, so the template is loaded.
+        self.templates["icon.html"] = "{% include icon_name %}"
+        stats = AnalysisStats()
+        names = get_names(self.engine.get_template("page.html"), stats=stats)
+        self.assertEqual(names, ["page", "partial", "partial"])
+        self.assertEqual(stats.includes_skipped, 0)
+
+        self.templates["icon.html"] = "{{ block.super }}"
+        self.assertTrue(get_source_info(self.engine.engine, "icon.html").is_dynamic)
+
+    def test_source_changed(self):
+        cache = ResultCache()
+        template = self.engine.get_template("page.html")
+        self.assertEqual(get_names(template, cache), ["page", "partial", "partial"])
+
+        # The skipped template is still a dependency of the cached result.
+        self.templates["icon.html"] = LOAD + '{% placeholder "icon" %}'
+        self.assertEqual(get_names(template, cache), ["page", "icon", "partial", "partial"])
+
+    def test_not_registered(self):
+        unregister_tag_names(Placeholder)
+        stats = AnalysisStats()
+        get_names(self.engine.get_template("page.html"), stats=stats)
+        self.assertEqual(stats.includes_skipped, 0)
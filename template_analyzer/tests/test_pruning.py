@@ -0,0 +1,100 @@
+from unittest import mock
+
+from django.template.defaulttags import ForNode, IfNode
+from django.template.loader import get_template
+from django.test import SimpleTestCase
+
+from template_analyzer import djangoanalyzer
+from template_analyzer.djangoanalyzer import find_node_instances
+from template_analyzer.stats import AnalysisStats
+from template_analyzer.templatetags.template_analyzer_test_tags import Placeholder
+from template_analyzer.tests.utils import get_locmem_engine
+
+LOAD = "{% load template_analyzer_test_tags %}"
+
+
+def get_names(template, **kwargs):
+    return [node.get_name() for node in find_node_instances(template, Placeholder, **kwargs)]
+
+
+class PruningTestCase(SimpleTestCase):
+    def setUp(self):
+        self.engine = get_locmem_engine(
+            {
+                "base.html": LOAD + '{% placeholder "top" %}{% block header %}'
+                '{% placeholder "header" %}{% block title %}{% placeholder "title" %}'
+                "{% endblock %}{% endblock %}"
+                '{% block content %}{% endblock %}{% include "footer.html" %}',
+                "page.html": '{% extends "base.html" %}' + LOAD + "{% block content %}"
+                '{% placeholder "main" %}{% if x %}{% placeholder "if" %}'
+                '{% include "missing.html" %}{% endif %}'
+                '{% for i in x %}{% placeholder "for" %}{% endfor %}'
+                '{% include "partial.html" %}{% endblock %}',
+                "partial.html": LOAD + '{% placeholder "partial" %}{% include "nested.html" %}',
+                "nested.html": LOAD + '{% placeholder "nested" %}',
+                "footer.html": LOAD + '{% placeholder "footer" %}',
+            }
+        )
+        self.template = self.engine.get_template("page.html")
+
+    def test_skip_if(self):
+        self.assertEqual(
+            get_names(self.template, skip_types=[IfNode]),
+            ["main", "for", "partial", "nested", "header", "title", "top", "footer"],
+        )
+
+    def test_predicate(self):
+        names = get_names(
+            self.template, skip_types=[IfNode], predicate=lambda n: "t" in n.get_name()
+        )
+        self.assertEqual(names, ["partial", "nested", "title", "top", "footer"])
+
+    def test_skip_types(self):
+        # The include of the {% if %} is not loaded, otherwise it would raise an error.
+        names = get_names(self.template, skip_types=(IfNode, ForNode))
+        self.assertEqual(names, ["main", "partial", "nested", "header", "title", "top", "footer"])
+
+    def test_block_names(self):
+        stats = AnalysisStats()
+        names = get_names(self.template, skip_types=[IfNode], block_names=["title"], stats=stats)
+        self.assertEqual(names, ["title"])
+        self.assertEqual(stats.templates_loaded, {"django.template.loaders.locmem.Loader": 1})
+
+        names = get_names(self.template, skip_types=[IfNode], block_names=["content"])
+        self.assertEqual(names, ["main", "for", "partial", "nested"])
+
+    def test_block_names_without_extends(self):
+        template = self.engine.get_template("base.html")
+        self.assertEqual(get_names(template, block_names=["title"]), ["title"])
+        self.assertEqual(get_names(template, block_names=["header"]), ["header"])
+
+    def test_max_include_depth(self):
+        names = get_names(self.template, skip_types=[IfNode], max_include_depth=1)
+        self.assertEqual(names, ["main", "for", "partial", "header", "title", "top", "footer"])
+
+        names = get_names(self.template, skip_types=[IfNode], max_include_depth=0)
+        self.assertEqual(names, ["main", "for", "header", "title", "top"])
+
+    def test_block_super(self):
+        template = get_template("placeholder_tests/nested_super_level1.html")
+        names = get_names(template, block_names=["one"])
+        self.assertEqual(names, ["level1", "level2", "level3", "level4"])
+
+    def test_shared_inheritance(self):
+        """
+        The results are not cached, but the resolved chain is reused by the next call.
+        """
+        engine = get_locmem_engine(
+            {
+                "base.html": LOAD + '{% placeholder "base" %}{% block content %}{% endblock %}',
+                "page.html": '{% extends "base.html" %}' + LOAD + "{% block content %}"
+                '{% placeholder "page" %}{% endblock %}',
+            },
+            cached=True,
+        )
+        template = engine.get_template("page.html")
+        self.assertEqual(get_names(template, block_names=["content"]), ["page"])
+
+        with mock.patch.object(djangoanalyzer._Analysis, "_resolve_inheritance") as resolve:
+            self.assertEqual(get_names(template, skip_types=[IfNode]), ["page", "base"])
+        self.assertFalse(resolve.called)
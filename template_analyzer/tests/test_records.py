@@ -0,0 +1,59 @@
+import pickle
+
+from django.template.loader import get_template
+from django.test import SimpleTestCase
+
+from template_analyzer.autoreload import reanalyze
+from template_analyzer.cache import ResultCache, invalidate_template
+from template_analyzer.djangoanalyzer import get_node_instances, get_node_records
+from template_analyzer.records import NodeRecord
+from template_analyzer.templatetags.template_analyzer_test_tags import Placeholder
+
+
+class NodeRecordTestCase(SimpleTestCase):
+    def test_get_node_records(self):
+        template = get_template("placeholder_tests/test_two.html")
+        records = get_node_records(template, Placeholder, cache=False)
+        self.assertEqual(
+            records,
+            [
+                NodeRecord(Placeholder, "child", "placeholder_tests/child.html", "one", 3),
+                NodeRecord(Placeholder, "three", "placeholder_tests/base.html", "three", 12),
+            ],
+        )
+        nodes = get_node_instances(template, Placeholder, cache=False)
+        self.assertEqual([record.name for record in records], [n.get_name() for n in nodes])
+
+    def test_get_name(self):
+        template = get_template("placeholder_tests/test_two.html")
+        records = get_node_records(
+            template, Placeholder, cache=False, get_name=lambda node: node.get_name().upper()
+        )
+        self.assertEqual([record.name for record in records], ["CHILD", "THREE"])
+
+    def test_pickle(self):
+        template = get_template("placeholder_tests/test_one.html")
+        records = get_node_records(template, Placeholder, cache=False)
+        self.assertEqual(pickle.loads(pickle.dumps(records)), records)
+        self.assertFalse(hasattr(records[0], "__dict__"))
+
+    def test_cache(self):
+        cache = ResultCache()
+        template = get_template("placeholder_tests/test_two.html")
+        records = get_node_records(template, Placeholder, cache=cache)
+
+        # Only the records are stored, not the Node objects.
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(list(cache._entries.values())[0][0], records)
+        self.assertIs(get_node_records(template, Placeholder, cache=cache)[0], records[0])
+
+    def test_reanalyze(self):
+        cache = ResultCache()
+        template = get_template("placeholder_tests/test_two.html")
+        records = get_node_records(template, Placeholder, cache=cache)
+
+        removed = invalidate_template(template.origin.name)
+        self.assertEqual(len(cache), 0)
+        reanalyze(removed)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(get_node_records(template, Placeholder, cache=cache), records)
@@ -0,0 +1,150 @@
+import functools
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache as default_cache
+from django.template.backends.django import DjangoTemplates
+from django.template.loader import get_template
+from django.test import SimpleTestCase, override_settings
+
+from template_analyzer import djangoanalyzer
+from template_analyzer.djangoanalyzer import get_node_instances, get_node_records
+from template_analyzer.records import get_node_name
+from template_analyzer.sharedcache import SharedResultCache, get_default_shared_cache
+from template_analyzer.templatetags.template_analyzer_test_tags import Placeholder
+from template_analyzer.tests.utils import get_locmem_engine
+
+
+class SharedResultCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        default_cache.clear()
+
+    def test_get_node_records(self):
+        cache = SharedResultCache()
+        template = get_template("placeholder_tests/test_two.html")
+        records = get_node_records(template, Placeholder, cache=cache)
+        self.assertEqual([record.name for record in records], ["child", "three"])
+
+        # Another process finds the results by the template name and the sources.
+        with mock.patch.object(djangoanalyzer, "_scan_nodes") as scan_nodes:
+            cached = get_node_records(template, Placeholder, cache=SharedResultCache())
+        self.assertFalse(scan_nodes.called)
+        self.assertEqual(cached, records)
+        self.assertIsNot(cached[0], records[0])
+
+    def test_source_changed(self):
+        templates = {
+            "base.html": '{% load template_analyzer_test_tags %}{% placeholder "base" %}',
+            "page.html": '{% extends "base.html" %}',
+        }
+        engine = get_locmem_engine(templates)
+        cache = SharedResultCache()
+        template = engine.get_template("page.html")
+        get_node_records(template, Placeholder, cache=cache)
+        self.assertEqual(
+            len(cache.get(cache.make_records_key(template.template, ((None, Placeholder),)))), 1
+        )
+
+        # The results are stored by the source of all templates, including the parent.
+        templates["base.html"] = "{% load template_analyzer_test_tags %}"
+        self.assertIsNone(
+            cache.get(cache.make_records_key(template.template, ((None, Placeholder),)))
+        )
+        self.assertEqual(
+            get_node_records(engine.get_template("page.html"), Placeholder, cache), []
+        )
+
+    def test_overridden_template(self):
+        # A template that extends the template with the same name in another directory.
+        override_dir = tempfile.mkdtemp()
+        base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, override_dir)
+        self.addCleanup(shutil.rmtree, base_dir)
+        with open(os.path.join(override_dir, "page.html"), "w") as f:
+            f.write(
+                '{% extends "page.html" %}{% load template_analyzer_test_tags %}'
+                '{% block content %}{% placeholder "override" %}{{ block.super }}{% endblock %}'
+            )
+        with open(os.path.join(base_dir, "page.html"), "w") as f:
+            f.write(
+                "{% load template_analyzer_test_tags %}"
+                '{% block content %}{% placeholder "base" %}{% endblock %}'
+            )
+
+        engine = DjangoTemplates(
+            {
+                "NAME": "shared_cache_test",
+                "DIRS": (override_dir, base_dir),
+                "APP_DIRS": False,
+                "OPTIONS": {"loaders": ["django.template.loaders.filesystem.Loader"]},
+            }
+        )
+        template = engine.get_template("page.html")
+        records = get_node_records(template, Placeholder, cache=SharedResultCache())
+        self.assertEqual([record.name for record in records], ["override", "base"])
+
+        # Both templates are read by their own origin, so the results are found again.
+        with mock.patch.object(djangoanalyzer, "_scan_nodes") as scan_nodes:
+            cached = get_node_records(template, Placeholder, cache=SharedResultCache())
+        self.assertFalse(scan_nodes.called)
+        self.assertEqual(cached, records)
+
+    def test_other_engine(self):
+        # Two engines that provide another template by the same name.
+        engines = []
+        for name in ("one", "two"):
+            template_dir = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, template_dir)
+            with open(os.path.join(template_dir, "page.html"), "w") as f:
+                f.write('{% load template_analyzer_test_tags %}{% placeholder "' + name + '" %}')
+            engines.append(
+                DjangoTemplates(
+                    {
+                        "NAME": "shared_cache_" + name,
+                        "DIRS": (template_dir,),
+                        "APP_DIRS": False,
+                        "OPTIONS": {"loaders": ["django.template.loaders.filesystem.Loader"]},
+                    }
+                )
+            )
+
+        for engine, name in zip(engines, ("one", "two")):
+            template = engine.get_template("page.html")
+            records = get_node_records(template, Placeholder, cache=SharedResultCache())
+            self.assertEqual([record.name for record in records], [name])
+
+    def test_get_name(self):
+        cache = SharedResultCache()
+        template = get_template("placeholder_tests/test_two.html")
+        queries = ((None, Placeholder),)
+        self.assertIsNotNone(cache.make_records_key(template.template, queries, get_node_name))
+        self.assertNotEqual(
+            cache.make_records_key(template.template, queries, get_node_name),
+            cache.make_records_key(template.template, queries),
+        )
+        # A lambda can't be recognized in other processes.
+        self.assertIsNone(cache.make_records_key(template.template, queries, lambda node: None))
+        self.assertIsNone(
+            cache.make_records_key(template.template, queries, functools.partial(get_node_name))
+        )
+        records = get_node_records(
+            template, Placeholder, cache=cache, get_name=functools.partial(get_node_name)
+        )
+        self.assertEqual([record.name for record in records], ["child", "three"])
+
+    def test_node_instances(self):
+        template = get_template("placeholder_tests/test_two.html")
+        with self.assertRaises(TypeError):
+            get_node_instances(template, Placeholder, cache=SharedResultCache())
+
+    @override_settings(TEMPLATE_ANALYZER_SHARED_CACHE="default")
+    def test_setting(self):
+        cache = get_default_shared_cache()
+        self.assertEqual(cache.alias, "default")
+
+        template = get_template("placeholder_tests/test_two.html")
+        records = get_node_records(template, Placeholder)
+        key = cache.make_records_key(template.template, ((None, Placeholder),))
+        self.assertEqual(cache.get(key), records)
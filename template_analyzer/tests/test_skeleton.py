@@ -0,0 +1,150 @@
+import os
+
+from django.template import Context, TemplateSyntaxError, engines
+from django.template.defaulttags import IfNode
+from django.template.loader import get_template
+from django.template.loader_tags import BlockNode, IncludeNode
+from django.test import SimpleTestCase, override_settings
+
+from template_analyzer.cache import ResultCache
+from template_analyzer.djangoanalyzer import get_node_instances, get_node_records
+from template_analyzer.manifest import analyze_template
+from template_analyzer.prefilter import register_tag_names, unregister_tag_names
+from template_analyzer.skeleton import (
+    SkeletonNode,
+    SkeletonTemplate,
+    get_analysis_template,
+    get_skeleton_template,
+)
+from template_analyzer.templatetags.template_analyzer_test_tags import Placeholder
+from template_analyzer.tests.utils import get_locmem_engine
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates")
+PLACEHOLDER = "template_analyzer.templatetags.template_analyzer_test_tags.Placeholder"
+
+
+def get_results(template_name, by_name=False):
+    try:
+        if by_name:
+            engine = engines["django"].engine
+            template = get_analysis_template(engine, template_name, ((None, Placeholder),))
+        else:
+            template = get_template(template_name)
+        return get_node_records(template, Placeholder, cache=False)
+    except Exception as e:
+        return e.__class__
+
+
+class SkeletonTestCase(SimpleTestCase):
+    def setUp(self):
+        register_tag_names(Placeholder, ("placeholder",))
+        self.addCleanup(unregister_tag_names, Placeholder)
+
+    def test_skeleton_template(self):
+        engine = get_locmem_engine(
+            {
+                "page.html": "{% load template_analyzer_test_tags %}<p>{{ title|upper }}</p>"
+                '{% if x %}{% url "home" %}{% elif y %}{% placeholder "y" %}{% else %}'
+                '{% include "partial.html" %}{% endif %}{% block a %}{{ block.super }}{% endblock %}'
+            }
+        )
+        template = get_skeleton_template(engine.engine, "page.html")
+        self.assertIsInstance(template, SkeletonTemplate)
+        self.assertIs(get_skeleton_template(engine.engine, "page.html"), template)
+
+        node_types = [type(node) for node in template.nodelist]
+        self.assertNotIn(IfNode, node_types)
+        self.assertEqual(len(template.nodelist.get_nodes_by_type(SkeletonNode)), 1)
+        self.assertEqual(len(template.nodelist.get_nodes_by_type(Placeholder)), 1)
+        self.assertEqual(len(template.nodelist.get_nodes_by_type(IncludeNode)), 1)
+        block = template.nodelist.get_nodes_by_type(BlockNode)[0]
+        self.assertEqual(block.nodelist[0].filter_expression.token, "block.super")
+
+        with self.assertRaises(TemplateSyntaxError):
+            template.render({})
+
+    def test_extends_must_be_first(self):
+        engine = get_locmem_engine({"page.html": '{{ x }}{% extends "base.html" %}'})
+        with self.assertRaises(TemplateSyntaxError):
+            get_skeleton_template(engine.engine, "page.html")
+
+    def test_identical_results(self):
+        """
+        The skeleton templates give the same results as the fully parsed templates.
+        """
+        names = sorted(os.listdir(os.path.join(TEMPLATE_DIR, "placeholder_tests")))
+        for name in names:
+            template_name = "placeholder_tests/" + name
+            with self.subTest(template_name):
+                expected = get_results(template_name)
+                with override_settings(TEMPLATE_ANALYZER_SKELETON=True):
+                    self.assertEqual(get_results(template_name), expected)
+                    # The analyzed template itself is a skeleton too.
+                    self.assertEqual(get_results(template_name, by_name=True), expected)
+
+    def test_analysis_template(self):
+        engine = engines["django"].engine
+        name = "placeholder_tests/test_two.html"
+        queries = ((None, Placeholder),)
+        self.assertNotIsInstance(get_analysis_template(engine, name, queries), SkeletonTemplate)
+
+        with override_settings(TEMPLATE_ANALYZER_SKELETON=True):
+            self.assertIsInstance(get_analysis_template(engine, name, queries), SkeletonTemplate)
+            # The nodes of built-in tags are not part of the skeleton.
+            self.assertNotIsInstance(
+                get_analysis_template(engine, name, ((None, IfNode),)), SkeletonTemplate
+            )
+
+    def test_analyze_templates_command(self):
+        name = "placeholder_tests/test_four.html"
+        expected = analyze_template("django", name, [PLACEHOLDER])
+        with override_settings(TEMPLATE_ANALYZER_SKELETON=True):
+            self.assertEqual(analyze_template("django", name, [PLACEHOLDER]), expected)
+
+    @override_settings(TEMPLATE_ANALYZER_SKELETON=True)
+    def test_skeleton_analysis(self):
+        template = get_template("placeholder_tests/test_two.html")
+        nodes = get_node_instances(template, Placeholder, cache=False)
+        self.assertEqual([node.get_name() for node in nodes], ["child", "three"])
+
+        # The parent and included templates are loaded as skeleton.
+        self.assertIsInstance(nodes[0].origin, type(template.origin))
+        skeleton = get_skeleton_template(template.template.engine, "placeholder_tests/base.html")
+        self.assertIn(nodes[1], skeleton.nodelist.get_nodes_by_type(Placeholder))
+
+    def test_render_nodes(self):
+        engine = get_locmem_engine(
+            {
+                "page.html": "{% load template_analyzer_test_tags %}{% block a %}"
+                '{% placeholder "a" %}{% if x %}{% placeholder "x" %}{% endif %}'
+                '{% url "home" %}{% endblock %}'
+            }
+        )
+        template = get_skeleton_template(engine.engine, "page.html")
+        block = template.nodelist.get_nodes_by_type(BlockNode)[0]
+        # The replaced built-in tags render as an empty string, including their contents.
+        self.assertEqual(block.nodelist.render(Context()), "[placeholder: a]")
+
+    @override_settings(TEMPLATE_ANALYZER_SKELETON=True)
+    def test_not_cached(self):
+        """
+        The results of a skeleton are not returned for the normally loaded template.
+        """
+        engine = engines["django"].engine
+        name = "placeholder_tests/test_two.html"
+        cache = ResultCache()
+        skeleton = get_analysis_template(engine, name, ((None, Placeholder),))
+        nodes = get_node_instances(skeleton, Placeholder, cache=cache)
+        self.assertEqual([node.get_name() for node in nodes], ["child", "three"])
+        self.assertIsNone(cache.make_key(skeleton, ((None, Placeholder),)))
+
+        template = engine.get_template(name)
+        self.assertIsNone(cache.get(cache.make_key(template, ((None, Placeholder),))))
+
+    @override_settings(TEMPLATE_ANALYZER_SKELETON=True)
+    def test_not_registered(self):
+        unregister_tag_names(Placeholder)
+        template = get_template("placeholder_tests/test_two.html")
+        nodes = get_node_instances(template, Placeholder, cache=False)
+        skeleton = get_skeleton_template(template.template.engine, "placeholder_tests/base.html")
+        self.assertNotIn(nodes[1], skeleton.nodelist.get_nodes_by_type(Placeholder))
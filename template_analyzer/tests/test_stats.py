@@ -0,0 +1,59 @@
+from django.template.loader import get_template
+from django.test import SimpleTestCase
+
+from template_analyzer.cache import ResultCache
+from template_analyzer.djangoanalyzer import first_node_instance, get_node_instances
+from template_analyzer.signals import analysis_finished
+from template_analyzer.stats import AnalysisStats
+from template_analyzer.templatetags.template_analyzer_test_tags import Placeholder
+
+APP_LOADER = "django.template.loaders.app_directories.Loader"
+
+
+class AnalysisStatsTestCase(SimpleTestCase):
+    def get_stats(self, filename, **kwargs):
+        stats = AnalysisStats()
+        get_node_instances(get_template(filename), Placeholder, stats=stats, **kwargs)
+        return stats
+
+    def test_extends(self):
+        stats = self.get_stats("placeholder_tests/nested_super_level1.html", cache=False)
+        self.assertEqual(stats.template_name, "placeholder_tests/nested_super_level1.html")
+        self.assertEqual(stats.templates_loaded, {APP_LOADER: 3})
+        self.assertEqual(stats.max_extends_depth, 3)
+        self.assertEqual(stats.max_include_depth, 0)
+        self.assertEqual(stats.super_resolutions, 3)
+        self.assertGreater(stats.nodes_visited, 0)
+        self.assertGreater(stats.duration, 0)
+
+    def test_includes(self):
+        stats = self.get_stats("placeholder_tests/include_twice.html", cache=False)
+        self.assertEqual(stats.templates_loaded, {APP_LOADER: 2})
+        self.assertEqual(stats.max_extends_depth, 1)
+        self.assertEqual(stats.max_include_depth, 1)
+        self.assertEqual(stats.includes_reused, 1)
+
+    def test_cache(self):
+        cache = ResultCache()
+        stats = self.get_stats("placeholder_tests/test_two.html", cache=cache)
+        self.assertEqual((stats.cache_hits, stats.cache_misses), (0, 2))
+
+        stats = self.get_stats("placeholder_tests/test_two.html", cache=cache)
+        self.assertEqual((stats.cache_hits, stats.cache_misses), (1, 0))
+        self.assertEqual(stats.nodes_visited, 0)
+        self.assertEqual(stats.as_dict()["cache_hits"], 1)
+
+    def test_signal(self):
+        received = []
+
+        def receiver(sender, stats, **kwargs):
+            received.append(stats)
+
+        analysis_finished.connect(receiver)
+        self.addCleanup(analysis_finished.disconnect, receiver)
+
+        # The signal is also sent when the scan stops early.
+        template = get_template("placeholder_tests/test_one.html")
+        first_node_instance(template, Placeholder, cache=False)
+        self.assertEqual(len(received), 1)
+        self.assertEqual(received[0].template_name, "placeholder_tests/test_one.html")
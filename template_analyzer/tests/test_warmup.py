@@ -0,0 +1,115 @@
+from unittest import mock
+
+from django.apps import apps
+from django.template.loader import get_template
+from django.test import SimpleTestCase, override_settings
+
+from template_analyzer import cache as cache_module
+from template_analyzer import djangoanalyzer
+from template_analyzer import skeleton as skeleton_module
+from template_analyzer.apps import TemplateAnalyzerConfig
+from template_analyzer.cache import ResultCache, get_default_cache
+from template_analyzer.djangoanalyzer import get_node_instances
+from template_analyzer.prefilter import register_tag_names, unregister_tag_names
+from template_analyzer.skeleton import get_skeleton_template
+from template_analyzer.templatetags.template_analyzer_test_tags import Placeholder
+from template_analyzer.warmup import find_warmup_templates, start_warmup, warmup
+
+PLACEHOLDER = "template_analyzer.templatetags.template_analyzer_test_tags.Placeholder"
+
+
+class WarmupTestCase(SimpleTestCase):
+    def tearDown(self):
+        cache_module._default_cache = None
+
+    def test_find_warmup_templates(self):
+        templates = list(
+            find_warmup_templates(
+                ["placeholder_tests/base.html", "placeholder_tests/test_t*.html"]
+            )
+        )
+        self.assertEqual(
+            templates,
+            [
+                (None, "placeholder_tests/base.html"),
+                ("django", "placeholder_tests/test_three.html"),
+                ("django", "placeholder_tests/test_two.html"),
+            ],
+        )
+
+    def test_warmup(self):
+        cache = ResultCache()
+        count = warmup(["placeholder_tests/test_t*.html"], [PLACEHOLDER], cache=cache)
+        self.assertEqual(count, 2)
+
+        # The results are read from the cache now.
+        template = get_template("placeholder_tests/test_two.html")
+        with mock.patch.object(djangoanalyzer, "_scan_nodes") as mock_scan:
+            nodes = get_node_instances(template, Placeholder, cache=cache)
+        mock_scan.assert_not_called()
+        self.assertEqual([node.get_name() for node in nodes], ["child", "three"])
+
+    @override_settings(TEMPLATE_ANALYZER_SKELETON=True)
+    def test_warmup_skeleton(self):
+        register_tag_names(Placeholder, ("placeholder",))
+        self.addCleanup(unregister_tag_names, Placeholder)
+        cache = ResultCache()
+        name = "placeholder_tests/test_two.html"
+        with mock.patch.object(
+            skeleton_module, "get_skeleton_template", wraps=get_skeleton_template
+        ) as mock_get:
+            self.assertEqual(warmup([name], [PLACEHOLDER], cache=cache), 1)
+
+        # The template is loaded normally, only its parent and includes are a skeleton.
+        names = [call[0][1] for call in mock_get.call_args_list]
+        self.assertNotIn(name, names)
+        self.assertIn("placeholder_tests/base.html", names)
+
+        # The results are used for the normally loaded template.
+        with mock.patch.object(djangoanalyzer, "_scan_nodes") as mock_scan:
+            nodes = get_node_instances(get_template(name), Placeholder, cache=cache)
+        mock_scan.assert_not_called()
+        self.assertEqual([node.get_name() for node in nodes], ["child", "three"])
+
+    def test_warmup_error(self):
+        with self.assertLogs("template_analyzer.warmup", "ERROR"):
+            count = warmup(["placeholder_tests/missing.html"], [Placeholder], cache=False)
+        self.assertEqual(count, 0)
+
+    @override_settings(
+        TEMPLATE_ANALYZER_CACHE_SIZE=10,
+        TEMPLATE_ANALYZER_WARMUP_TEMPLATES=["placeholder_tests/test_two.html"],
+        TEMPLATE_ANALYZER_WARMUP_NODE_TYPES=[PLACEHOLDER],
+    )
+    def test_start_warmup(self):
+        thread = start_warmup()
+        thread.join()
+        template = get_template("placeholder_tests/test_two.html").template
+        self.assertIsNotNone(
+            get_default_cache().get(get_default_cache().make_key(template, ((None, Placeholder),)))
+        )
+
+        with override_settings(TEMPLATE_ANALYZER_WARMUP_BACKGROUND=False):
+            get_default_cache().clear()
+            self.assertIsNone(start_warmup())
+            self.assertEqual(len(get_default_cache()), 2)  # the template and its include
+
+    @override_settings(
+        TEMPLATE_ANALYZER_WARMUP_TEMPLATES=["placeholder_tests/test_two.html"],
+        TEMPLATE_ANALYZER_WARMUP_NODE_TYPES=[PLACEHOLDER],
+        TEMPLATE_ANALYZER_WARMUP_BACKGROUND=False,
+    )
+    def test_start_warmup_without_cache(self):
+        with self.assertLogs("template_analyzer.warmup", "WARNING") as logs:
+            start_warmup()
+        self.assertIn("TEMPLATE_ANALYZER_CACHE_SIZE is not", logs.output[0])
+
+    def test_not_configured(self):
+        self.assertIsNone(start_warmup())
+
+    def test_app_config(self):
+        app_config = apps.get_app_config("template_analyzer")
+        self.assertIsInstance(app_config, TemplateAnalyzerConfig)
+        with mock.patch("template_analyzer.warmup.start_warmup") as mock_start:
+            app_config.ready()
+        mock_start.assert_called_once_with()
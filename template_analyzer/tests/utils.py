@@ -0,0 +1,71 @@
+"""
+Helpers that are shared by the tests.
+"""
+
+import os
+import shutil
+import tempfile
+
+from django.template.backends.django import DjangoTemplates
+
+from template_analyzer.djangoanalyzer import get_node_instances
+from template_analyzer.templatetags.template_analyzer_test_tags import Placeholder
+
+LOAD_TAGS = "{% load template_analyzer_test_tags %}"
+
+
+def get_locmem_engine(templates, cached=False):
+    """
+    Construct an engine that loads the templates from a dict, so tests can change them.
+    """
+    loaders = [("django.template.loaders.locmem.Loader", templates)]
+    if cached:
+        loaders = [("django.template.loaders.cached.Loader", loaders)]
+    return DjangoTemplates(
+        {
+            "NAME": "locmem_test",
+            "DIRS": (),
+            "APP_DIRS": False,
+            "OPTIONS": {"loaders": loaders},
+        }
+    )
+
+
+class TemplateDirMixin:
+    """
+    Provide a writable template directory, so templates can be changed during a test.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.template_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.template_dir)
+        self.engine = DjangoTemplates(
+            {
+                "NAME": "analyzer_test",
+                "DIRS": (self.template_dir,),
+                "APP_DIRS": False,
+                "OPTIONS": {"loaders": ("django.template.loaders.filesystem.Loader",)},
+            }
+        )
+
+    def write_template(self, name, source):
+        # The {% load %} tag is added after the {% extends %} tag, which needs to come first.
+        if source.startswith("{% extends"):
+            end = source.index("%}") + 2
+            source = source[:end] + LOAD_TAGS + source[end:]
+        else:
+            source = LOAD_TAGS + source
+
+        path = os.path.join(self.template_dir, name)
+        exists = os.path.exists(path)
+        with open(path, "w") as f:
+            f.write(source)
+        if exists:
+            # Make sure the change is noticed, even on file systems with a coarse mtime.
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+    def get_placeholders(self, name, **kwargs):
+        template = self.engine.get_template(name)
+        return [p.get_name() for p in get_node_instances(template, Placeholder, **kwargs)]
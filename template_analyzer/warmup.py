@@ -0,0 +1,108 @@
+"""
+Analyzing templates at startup, so the first request doesn't have to wait for it.
+"""
+
+import logging
+import threading
+from fnmatch import fnmatchcase
+
+from django.conf import settings
+from django.template import engines
+from django.template.loader import get_template
+from django.utils.module_loading import import_string
+
+from .cache import get_default_cache
+from .discovery import find_templates
+from .djangoanalyzer import _get_node_instances
+
+logger = logging.getLogger(__name__)
+
+
+def _has_magic(pattern):
+    return any(char in pattern for char in "*?[")
+
+
+def find_warmup_templates(patterns, using=None):
+    """
+    Find the templates that match the names or glob patterns.
+
+    :param patterns: Template names, or glob patterns such as ``"mycms/*.html"``.
+    :param using: The alias of the template engine to use, by default all engines are used.
+    :returns: An iterator of ``(engine alias, template name)`` tuples.
+    """
+    names = [pattern for pattern in patterns if not _has_magic(pattern)]
+    globs = [pattern for pattern in patterns if _has_magic(pattern)]
+    for name in names:
+        yield using, name
+
+    if globs:
+        for alias, name in find_templates(using=using):
+            if name not in names and any(fnmatchcase(name, pattern) for pattern in globs):
+                yield alias, name
+
+
+def warmup(patterns, node_types, using=None, cache=None):
+    """
+    Analyze the templates, so the results are stored in the cache.
+    The templates are also loaded in the cached template loader.
+    With ``TEMPLATE_ANALYZER_SKELETON``, their parents and includes are parsed as skeleton.
+
+    Each node type is analyzed separately, which gives the results
+    that :func:`~template_analyzer.get_node_instances` reads from the cache.
+
+    :param patterns: Template names, or glob patterns such as ``"mycms/*.html"``.
+    :param node_types: The Node classes, or their dotted paths.
+    :param using: The alias of the template engine to use.
+    :param cache: The :class:`~template_analyzer.cache.ResultCache` to fill,
+                  by default the cache configured by ``TEMPLATE_ANALYZER_CACHE_SIZE`` is used.
+    :returns: The number of analyzed templates.
+    """
+    node_types = [
+        import_string(node_type) if isinstance(node_type, str) else node_type
+        for node_type in node_types
+    ]
+
+    count = 0
+    for alias, name in find_warmup_templates(patterns, using=using):
+        try:
+            # The template is loaded like the callers do, so they find the results in the cache.
+            template = engines[alias].get_template(name) if alias else get_template(name)
+            for node_type in node_types:
+                _get_node_instances(template, ((None, node_type),), cache)
+        except Exception:
+            # A broken template shouldn't prevent the application from starting.
+            logger.exception("Unable to analyze template %s", name)
+        else:
+            count += 1
+
+    logger.debug("Analyzed %d templates at startup", count)
+    return count
+
+
+def start_warmup():
+    """
+    Start the analysis of the templates that are configured by the settings.
+
+    :returns: The background thread, or ``None`` when the analysis is finished already.
+    """
+    patterns = getattr(settings, "TEMPLATE_ANALYZER_WARMUP_TEMPLATES", None)
+    node_types = getattr(settings, "TEMPLATE_ANALYZER_WARMUP_NODE_TYPES", None)
+    if not patterns or not node_types:
+        return None
+
+    if get_default_cache() is None:
+        # The results can't be kept, only the cached template loader is filled.
+        logger.warning(
+            "TEMPLATE_ANALYZER_WARMUP_TEMPLATES is set, but TEMPLATE_ANALYZER_CACHE_SIZE is not."
+            " The warmup only loads the templates, the analysis results are not cached."
+        )
+
+    if not getattr(settings, "TEMPLATE_ANALYZER_WARMUP_BACKGROUND", True):
+        warmup(patterns, node_types)
+        return None
+
+    thread = threading.Thread(
+        target=warmup, args=(patterns, node_types), name="template_analyzer_warmup", daemon=True
+    )
+    thread.start()
+    return thread